@@ -0,0 +1,202 @@
+"""Пакетная обработка корпуса без графического интерфейса.
+
+Примеры запуска:
+    python batch_processor.py corpus_dir/ -o result.jsonl
+    python batch_processor.py corpus.jsonl --batch-size 256 --n-process 4
+    python batch_processor.py corpus.jsonl --workers 8 -o result.jsonl
+    python batch_processor.py dump.txt --split paragraph -o result.jsonl
+    python batch_processor.py corpus.jsonl --profile --log-level INFO -o result.jsonl
+    python batch_processor.py corpus.jsonl --dictionaries terms/ -o result.jsonl
+    python batch_processor.py feed.jsonl --window-docs 5000 --render recent.png -o result.jsonl
+    python batch_processor.py corpus.jsonl --pipeline --queue-size 4 -o result.jsonl
+    cat texts.txt | python batch_processor.py - > result.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from extraction_cache import ExtractionCache
+from graph_merge import GraphBatch
+from graph_store import SQLiteGraphStore
+from ingest_pipeline import ingest_pipelined
+from jsonl_export import JsonlWriter
+from mmap_reader import read_chunks
+from parallel_ingest import ingest_parallel
+from profiling import configure_logging, profiler
+from sliding_window import SlidingWindow
+from term_dictionaries import TermDictionaries
+from texr_processor import MERGE_BATCH_DOCS, SemanticObjectEditor
+
+
+def read_directory(path):
+    """Читает все .txt файлы каталога, один файл - один документ."""
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".txt"):
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                yield name, f.read()
+
+
+def read_jsonl(lines, source):
+    """Читает документы из JSONL: в каждой строке объект с полем "text" и необязательным "id"."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        yield record.get("id", f"{source}:{number}"), record["text"]
+
+
+def read_lines(lines, source):
+    """Читает документы построчно: каждая непустая строка - отдельный документ."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if line:
+            yield f"{source}:{number}", line
+
+
+def read_documents(source, jsonl=False, split="line"):
+    """Возвращает генератор пар (id, текст) для каталога, JSONL-файла или stdin ("-").
+
+    split="paragraph" или "sentence" читает текстовый файл через mmap фрагментами
+    нужного размера вместо деления по строкам.
+    """
+    if split != "line" and source != "-" and not os.path.isdir(source):
+        yield from read_chunks(source, unit=split)
+    elif source == "-":
+        reader = read_jsonl if jsonl else read_lines
+        yield from reader(sys.stdin, "stdin")
+    elif os.path.isdir(source):
+        yield from read_directory(source)
+    else:
+        with open(source, encoding="utf-8") as f:
+            reader = read_jsonl if jsonl or source.endswith(".jsonl") else read_lines
+            yield from reader(f, os.path.basename(source))
+
+
+def process_corpus(documents, writer, editor=None, batch_size=64, n_process=1, store=None, build_graph=False):
+    """Разбирает документы через nlp.pipe и потоково пишет результаты в JsonlWriter и хранилище.
+
+    При build_graph=True сущности и связи также собираются в граф редактора пакетами
+    по MERGE_BATCH_DOCS документов.
+    """
+    editor = editor or SemanticObjectEditor()
+    pairs = ((text, doc_id) for doc_id, text in documents)
+    count = 0
+    batch = GraphBatch()
+    for (entities, relations), doc_id in editor.process_texts(
+        pairs, batch_size=batch_size, n_process=n_process, as_tuples=True
+    ):
+        writer.write_result(doc_id, editor.generate_data(entities, relations))
+        if store is not None:
+            store.add_to_graph(entities, relations, source=doc_id)
+        if build_graph:
+            batch.add(entities, relations, source=doc_id)
+            if len(batch) >= MERGE_BATCH_DOCS:
+                editor.merge_batch(batch)
+                batch = GraphBatch()
+        count += 1
+    if build_graph:
+        editor.merge_batch(batch)
+    return count
+
+
+def render(editor, args):
+    """Сохраняет изображение графа редактора или выбранного представления."""
+    if args.ego:
+        graph = editor.ego_view(args.ego, radius=args.radius)
+    elif args.top:
+        graph = editor.top_view(args.top, by=args.by)
+    elif args.relation:
+        graph = editor.relation_view(args.relation)
+    else:
+        graph = editor.graph
+    editor.render_graph(args.render, graph=graph)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетное извлечение сущностей и связей из корпуса текстов.")
+    parser.add_argument("source", help="каталог с .txt файлами, JSONL-файл или '-' для stdin")
+    parser.add_argument("-o", "--output", default="-", help="файл для результатов в формате JSONL (по умолчанию stdout)")
+    parser.add_argument("--append", action="store_true", help="дописывать в существующий файл результатов")
+    parser.add_argument("--atomic", action="store_true", help="писать во временный файл и подменить им результат в конце")
+    parser.add_argument("--per-item", action="store_true", help="одна строка на сущность или связь вместо строки на документ")
+    parser.add_argument("--jsonl", action="store_true", help="читать вход как JSONL с полем 'text'")
+    parser.add_argument(
+        "--split", choices=["line", "paragraph", "sentence"], default="line",
+        help="как делить текстовый файл на документы; paragraph и sentence читают файл через mmap",
+    )
+    parser.add_argument("--batch-size", type=int, default=64, help="размер пакета для nlp.pipe")
+    parser.add_argument("--n-process", type=int, default=1, help="число процессов для nlp.pipe")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов параллельной загрузки по шардам")
+    parser.add_argument("--shard-size", type=int, default=256, help="число документов в шарде для --workers")
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="чтение, разбор, извлечение, слияние и выгрузка идут одновременно в конвейере на asyncio",
+    )
+    parser.add_argument("--queue-size", type=int, default=8, help="пакетов в каждой очереди конвейера для --pipeline")
+    parser.add_argument("--cache-dir", help="каталог дискового кэша разобранных документов и результатов")
+    parser.add_argument("--store", help="файл SQLite, в котором накапливается общий граф")
+    parser.add_argument("--cache-size", type=int, default=10000, help="размер LRU-кэша результатов в памяти")
+    parser.add_argument(
+        "--dictionaries", help="каталог словарей терминов: general.txt, question.txt, time.txt, location.txt",
+    )
+    parser.add_argument("--window-docs", type=int, help="граф для --render строится только по последним N документам")
+    parser.add_argument("--window-nodes", type=int, help="вытеснять старые документы, пока в окне больше N сущностей")
+    parser.add_argument("--render", help="сохранить изображение общего графа в файл (.png, .svg)")
+    parser.add_argument("--ego", help="рисовать только окрестность этой сущности")
+    parser.add_argument("--radius", type=int, default=1, help="радиус окрестности для --ego")
+    parser.add_argument("--top", type=int, help="рисовать только N самых важных узлов")
+    parser.add_argument("--by", choices=["degree", "frequency"], default="degree", help="мера важности для --top")
+    parser.add_argument("--relation", help="рисовать только связи этого типа")
+    parser.add_argument(
+        "--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="уровень журнала в stderr; DEBUG выводит разбор каждого предложения",
+    )
+    parser.add_argument("--log-json", action="store_true", help="писать журнал построчным JSON")
+    parser.add_argument("--profile", action="store_true", help="вывести в stderr время и число вызовов каждого этапа")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level, json_format=args.log_json)
+    profiler.enable(args.profile)
+
+    cache = ExtractionCache(max_size=args.cache_size, cache_dir=args.cache_dir) if args.cache_dir else None
+    dictionaries = TermDictionaries.load(args.dictionaries) if args.dictionaries else None
+    window = SlidingWindow(args.window_docs, max_nodes=args.window_nodes) if args.window_docs or args.window_nodes else None
+    editor = SemanticObjectEditor(cache=cache, dictionaries=dictionaries, window=window)
+    store = SQLiteGraphStore(args.store) if args.store else None
+    options = {"editor": editor, "batch_size": args.batch_size, "n_process": args.n_process, "store": store,
+               "build_graph": bool(args.render) and store is None}
+
+    pipeline = None
+    start = time.perf_counter()
+    documents = read_documents(args.source, jsonl=args.jsonl, split=args.split)
+    with JsonlWriter(args.output, append=args.append, atomic=args.atomic, per_item=args.per_item) as writer:
+        if args.workers > 1:
+            count = ingest_parallel(
+                documents, editor, workers=args.workers, shard_size=args.shard_size, batch_size=args.batch_size,
+                writer=writer, store=store, cache_size=args.cache_size, cache_dir=args.cache_dir,
+            )
+        elif args.pipeline:
+            count, pipeline = ingest_pipelined(
+                documents, editor, writer=writer, store=store, batch_size=args.batch_size,
+                queue_size=args.queue_size, build_graph=options["build_graph"],
+            )
+        else:
+            count = process_corpus(documents, writer, **options)
+    if args.render:
+        render(SemanticObjectEditor(graph=store.to_networkx()) if store is not None else editor, args)
+    if store is not None:
+        store.close()
+    elapsed = time.perf_counter() - start
+    print(f"Обработано документов: {count} за {elapsed:.2f} с", file=sys.stderr)
+    if cache is not None and args.workers <= 1 and pipeline is None:  # У процессов пула свои кэши, конвейер кэш не использует
+        print(f"Кэш: {cache.stats()}", file=sys.stderr)
+    if pipeline is not None:
+        print(pipeline.report(), file=sys.stderr)
+    if args.profile:
+        print(profiler.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
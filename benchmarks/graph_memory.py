@@ -0,0 +1,115 @@
+"""Память графа на ребро: CompactGraph против nx.DiGraph.
+
+Случайный граф строится так же, как в редакторе: пакетами add_to_graph, без
+явного чтения рёбер между пакетами. Для каждого хранилища печатается прирост
+памяти под tracemalloc (в нём видны и массивы NumPy) в байтах на ребро, для
+CompactGraph - ещё и оценка memory_usage(). Строки имён создаются заранее и в
+замер не входят. Отдельными строками - GraphIndex, который редактор ведёт для
+nx.DiGraph, и GraphIndex без индексов рёбер, который он ведёт для CompactGraph.
+
+Примеры запуска:
+    python benchmarks/graph_memory.py
+    python benchmarks/graph_memory.py --edges 1000000 --max-bytes-per-edge 16
+"""
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import networkx as nx  # noqa: E402
+
+from compact_graph import CompactGraph  # noqa: E402
+from graph_index import GraphIndex  # noqa: E402
+
+RELATIONS = ("performs", "acts_on", "has_attribute", "has_location", "has_time", "related_action")
+BATCH_SIZE = 1000  # Связей в одном вызове add_to_graph, как у результата документа с запасом
+
+
+def random_graph(nodes, edges, seed=0):
+    """Сущности и пакеты связей случайного графа без повторных пар."""
+    rng = random.Random(seed)
+    names = [f"сущность{i}" for i in range(nodes)]
+    pairs = set()
+    while len(pairs) < edges:
+        pairs.add((rng.randrange(nodes), rng.randrange(nodes)))
+    relations = [(names[head], names[tail], rng.choice(RELATIONS)) for head, tail in pairs]
+    entities = [(name, "MainEntity") for name in names]
+    return entities, [relations[start:start + BATCH_SIZE] for start in range(0, len(relations), BATCH_SIZE)]
+
+
+def traced(build):
+    """Прирост памяти (байты) после build() и его результат."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, value
+
+
+def build_compact(entities, batches):
+    graph = CompactGraph()
+    graph.add_to_graph(entities, [])
+    for batch in batches:
+        graph.add_to_graph((), batch)
+    return graph
+
+
+def build_networkx(entities, batches):
+    graph = nx.DiGraph()
+    graph.add_nodes_from((name, {"label": label}) for name, label in entities)
+    for batch in batches:
+        graph.add_edges_from((head, tail, {"relation": relation}) for head, tail, relation in batch)
+    return graph
+
+
+def build_index(entities, batches, edges=True):
+    index = GraphIndex(edges=edges)
+    for name, label in entities:
+        index.add_node(name, label)
+    for batch in batches:
+        for head, tail, relation in batch:
+            index.add_edge(head, tail, relation)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память графа на ребро: CompactGraph против nx.DiGraph.")
+    parser.add_argument("--nodes", type=int, default=20000, help="число узлов")
+    parser.add_argument("--edges", type=int, default=200000, help="число рёбер")
+    parser.add_argument("--max-bytes-per-edge", type=float,
+                        help="завершиться с ошибкой, если CompactGraph занимает больше байт на ребро")
+    args = parser.parse_args(argv)
+
+    entities, batches = random_graph(args.nodes, args.edges)
+    compact_bytes, compact = traced(lambda: build_compact(entities, batches))
+    networkx_bytes, networkx_graph = traced(lambda: build_networkx(entities, batches))
+    index_bytes, _ = traced(lambda: build_index(entities, batches))
+    node_index_bytes, _ = traced(lambda: build_index(entities, batches, edges=False))
+    assert compact.number_of_edges() == networkx_graph.number_of_edges() == args.edges
+
+    print(f"Узлов: {args.nodes}, рёбер: {args.edges}")
+    print(f"{'Хранилище':<28} {'байт':>14} {'байт/ребро':>11}")
+    rows = [
+        ("CompactGraph", compact_bytes),
+        ("CompactGraph.memory_usage()", compact.memory_usage()),
+        ("nx.DiGraph", networkx_bytes),
+        ("GraphIndex", index_bytes),
+        ("GraphIndex(edges=False)", node_index_bytes),
+    ]
+    for name, size in rows:
+        print(f"{name:<28} {size:>14} {size / args.edges:>11.1f}")
+
+    per_edge = compact_bytes / args.edges
+    if args.max_bytes_per_edge is not None and per_edge > args.max_bytes_per_edge:
+        print(f"CompactGraph: {per_edge:.1f} байт/ребро, больше {args.max_bytes_per_edge}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
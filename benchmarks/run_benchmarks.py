@@ -0,0 +1,218 @@
+"""Воспроизводимые замеры производительности конвейера извлечения.
+
+Каждый этап (разбор SpaCy, компиляция словарей терминов, правила process_doc,
+add_to_graph, generate_json, раскладка графа) замеряется отдельно: документы/с,
+токены/с и пиковая память. Результаты сравниваются с сохранённым базовым замером,
+если он снят с той же моделью.
+
+Базовый замер в репозитории (baseline.json) снят с --model blank:ru: пустой
+конвейер SpaCy с одним токенизатором доступен без загрузки модели, поэтому
+сравнение можно запустить где угодно. Для замеров с настоящей моделью сохраните
+свой базовый замер с --save-baseline --baseline <файл>.
+
+Примеры запуска:
+    python benchmarks/run_benchmarks.py --model blank:ru
+    python benchmarks/run_benchmarks.py --save-baseline --baseline my_baseline.json
+    python benchmarks/run_benchmarks.py --repeat 5 --tolerance 0.15
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import texr_processor  # noqa: E402
+from texr_processor import SemanticObjectEditor, get_nlp  # noqa: E402
+
+CORPUS_FILE = os.path.join(BENCH_DIR, "corpus.txt")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+# Документы разной длины: по одному, по три и по десять предложений корпуса
+DOCUMENT_SIZES = (1, 3, 10)
+
+
+def load_corpus(path=CORPUS_FILE):
+    """Читает предложения корпуса, пропуская пустые строки и комментарии."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def build_documents(sentences, sizes=DOCUMENT_SIZES):
+    """Собирает из предложений документы разной длины."""
+    documents = []
+    for size in sizes:
+        for start in range(0, len(sentences), size):
+            documents.append(" ".join(sentences[start:start + size]))
+    return documents
+
+
+def load_model(name):
+    """Загружает модель для замеров; blank:<язык> - пустой конвейер SpaCy только с токенизатором."""
+    if name.startswith("blank:"):
+        import spacy
+
+        texr_processor._nlp = spacy.blank(name.split(":", 1)[1])
+    else:
+        texr_processor.MODEL_NAME = name
+    return get_nlp()
+
+
+def run_stages(texts):
+    """Однократно выполняет все этапы и возвращает время каждого в секундах."""
+    timings = {}
+    editor = SemanticObjectEditor()
+
+    start = time.perf_counter()
+    docs = list(get_nlp().pipe(texts))
+    timings["parse"] = time.perf_counter() - start
+
+    # Словари компилируются отдельным этапом, иначе их время попало бы в первое правило
+    start = time.perf_counter()
+    editor.dictionaries.compile(get_nlp())
+    timings["dictionaries"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [editor.process_doc(doc) for doc in docs]
+    timings["rules"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for entities, relations in results:
+        editor.add_to_graph(entities, relations)
+    timings["graph"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for entities, relations in results:
+        editor.generate_json(entities, relations)
+    timings["json"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    editor.layout_graph()
+    timings["layout"] = time.perf_counter() - start
+    return timings, sum(len(doc) for doc in docs)
+
+
+def measure_memory(texts):
+    """Возвращает пиковый прирост памяти каждого этапа в мегабайтах (отдельным проходом под tracemalloc)."""
+    peaks = {}
+    editor = SemanticObjectEditor()
+    tracemalloc.start()
+
+    def stage(name, func):
+        # Учитывается только прирост памяти сверх уже занятой предыдущими этапами
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        value = func()
+        peaks[name] = (tracemalloc.get_traced_memory()[1] - before) / (1024 * 1024)
+        return value
+
+    docs = stage("parse", lambda: list(get_nlp().pipe(texts)))
+    stage("dictionaries", lambda: editor.dictionaries.compile(get_nlp()))
+    results = stage("rules", lambda: [editor.process_doc(doc) for doc in docs])
+    stage("graph", lambda: [editor.add_to_graph(entities, relations) for entities, relations in results])
+    stage("json", lambda: [editor.generate_json(entities, relations) for entities, relations in results])
+    stage("layout", editor.layout_graph)
+    tracemalloc.stop()
+    return peaks
+
+
+def run_benchmarks(texts, repeat=3, model=texr_processor.MODEL_NAME):
+    """Замеряет все этапы: берётся лучшее время из repeat прогонов."""
+    load_model(model)  # Загрузка модели не входит в замеры
+    best = {}
+    tokens = 0
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            timings, tokens = run_stages(texts)
+            for name, seconds in timings.items():
+                best[name] = min(seconds, best.get(name, seconds))
+        peaks = measure_memory(texts)
+
+    report = {}
+    for name, seconds in best.items():
+        seconds = max(seconds, 1e-9)
+        report[name] = {
+            "seconds": seconds,
+            "docs_per_sec": len(texts) / seconds,
+            "tokens_per_sec": tokens / seconds,
+            "peak_mb": peaks[name],
+        }
+    return {"model": model, "docs": len(texts), "tokens": tokens, "stages": report}
+
+
+def compare(report, baseline, tolerance):
+    """Сравнивает замер с базовым и возвращает список обнаруженных регрессий."""
+    regressions = []
+    for name, current in report["stages"].items():
+        previous = baseline["stages"].get(name)
+        if previous is None:
+            continue
+        if current["docs_per_sec"] < previous["docs_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: скорость {current['docs_per_sec']:.1f} док/с, базовая {previous['docs_per_sec']:.1f} док/с"
+            )
+        if current["peak_mb"] > previous["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: память {current['peak_mb']:.2f} МБ, базовая {previous['peak_mb']:.2f} МБ")
+    return regressions
+
+
+def print_report(report, baseline=None):
+    """Печатает таблицу результатов, при наличии базового замера - с отклонением скорости."""
+    print(f"Модель: {report['model']}, документов: {report['docs']}, токенов: {report['tokens']}")
+    print(f"{'Этап':<12} {'сек':>9} {'док/с':>11} {'токен/с':>12} {'пик, МБ':>9} {'к базе':>8}")
+    for name, stage in report["stages"].items():
+        delta = ""
+        if baseline and name in baseline["stages"] and baseline["stages"][name]["docs_per_sec"]:
+            delta = f"{stage['docs_per_sec'] / baseline['stages'][name]['docs_per_sec'] - 1:+.0%}"
+        print(
+            f"{name:<12} {stage['seconds']:>9.4f} {stage['docs_per_sec']:>11.1f} "
+            f"{stage['tokens_per_sec']:>12.1f} {stage['peak_mb']:>9.2f} {delta:>8}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности конвейера извлечения.")
+    parser.add_argument("--corpus", default=CORPUS_FILE, help="файл корпуса, одно предложение в строке")
+    parser.add_argument("--model", default=texr_processor.MODEL_NAME,
+                        help="модель SpaCy или blank:<язык> для пустого конвейера")
+    parser.add_argument("--repeat", type=int, default=3, help="число прогонов, берётся лучшее время")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="файл базового замера")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить текущий замер как базовый")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое отклонение от базового замера")
+    args = parser.parse_args(argv)
+
+    texts = build_documents(load_corpus(args.corpus))
+    report = run_benchmarks(texts, repeat=args.repeat, model=args.model)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("model") != report["model"]:
+            # Замеры с разными моделями несравнимы
+            print_report(report)
+            print(f"Базовый замер снят с моделью {baseline.get('model')}, а не {report['model']}: сравнение пропущено.")
+            return 0
+    print_report(report, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"Базовый замер сохранён в {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("Базовый замер не найден, сравнение пропущено (запустите с --save-baseline).")
+        return 0
+
+    regressions = compare(report, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Приведение сущностей к канонической форме.
+
+Правила извлечения называют узлы по лемме, а не по словоформе, поэтому «дети»,
+«детей» и «детям» становятся одним узлом, а «в парке» и «в парк» - одним местом.
+Ключ узла - лемма в нижнем регистре с заменой «ё» на «е»; для обстоятельств с
+предлогом - предлоги и лемма главного слова. Встреченные словоформы сохраняются
+как варианты узла.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+
+MAX_VARIANT_NAMES = 65536  # Для скольких имён редактор хранит словоформы
+
+
+@lru_cache(maxsize=65536)
+def canonical_form(lemma):
+    """Каноническая форма леммы: нижний регистр, «ё» заменена на «е»."""
+    return lemma.strip().lower().replace("ё", "е")
+
+
+@lru_cache(maxsize=65536)
+def canonical_phrase(prepositions, lemma):
+    """Каноническая форма обстоятельства: предлоги и лемма главного слова."""
+    return " ".join(canonical_form(word) for word in prepositions + (lemma,))
+
+
+class Canonicalizer:
+    """Канонические имена узлов и собранные для них словоформы.
+
+    Словоформы хранятся не более чем для max_names имён: при переполнении
+    забываются имена, которые дольше всех не встречались.
+    """
+
+    def __init__(self, max_names=MAX_VARIANT_NAMES):
+        self.max_names = max_names
+        self.variants = OrderedDict()  # каноническое имя -> множество словоформ
+
+    def key(self, token):
+        """Каноническое имя узла для токена без запоминания словоформы."""
+        return canonical_form(token.lemma_ or token.text)
+
+    def name(self, token):
+        """Каноническое имя узла для токена; словоформа запоминается как вариант."""
+        name = self.key(token)
+        self.add_variant(name, token.text.lower())
+        return name
+
+    def span(self, tokens):
+        """Каноническое имя многословного термина: леммы всех слов; для одного слова совпадает с name()."""
+        name = " ".join(self.key(token) for token in tokens)
+        self.add_variant(name, " ".join(token.text for token in tokens).lower())
+        return name
+
+    def phrase(self, prepositions, token):
+        """Каноническое имя обстоятельства «предлог + слово», например «в парке» -> «в парк»."""
+        words = tuple(preposition.text for preposition in prepositions)
+        name = canonical_phrase(words, token.lemma_ or token.text)
+        self.add_variant(name, " ".join(words + (token.text,)).lower())
+        return name
+
+    def add_variant(self, name, surface):
+        variants = self.variants.get(name)
+        if variants is None:
+            variants = self.variants[name] = set()
+            self._evict()
+        else:
+            self.variants.move_to_end(name)
+        variants.add(surface)
+
+    def merge(self, variants):
+        """Добавляет варианты, собранные при разборе документа, в другом процессе или редакторе."""
+        for name, surfaces in variants.items():
+            current = self.variants.get(name)
+            if current is None:
+                self.variants[name] = set(surfaces)
+            else:
+                current.update(surfaces)
+                self.variants.move_to_end(name)
+        self._evict()
+
+    def clear(self):
+        self.variants.clear()
+
+    def _evict(self):
+        while len(self.variants) > self.max_names:
+            self.variants.popitem(last=False)
@@ -0,0 +1,336 @@
+"""Компактное хранилище семантического графа на целочисленных идентификаторах.
+
+Имена сущностей, метки и типы связей интернируются в целые числа. Рёбра хранятся
+в столбцах: новые добавляются в буферы array и сливаются со сжатой CSR-частью
+(indptr/indices/relations в массивах NumPy) при чтении рёбер или когда буфер
+дорастает до четверти сжатой части (но не меньше COMPACT_MIN_EDGES рёбер). Так
+буфер не копит весь граф, если рёбра только добавляются, а слияния в сумме стоят
+O(E log E). Как и в nx.DiGraph, между парой узлов хранится одно ребро, повторная
+связь перезаписывает тип.
+"""
+import sys
+from array import array
+
+import numpy as np
+
+COMPACT_MIN_EDGES = 65536  # Буфер меньшего размера не сливается без чтения рёбер
+INT_BYTES = sys.getsizeof(1 << 20)  # Идентификатор в словаре интернирования - объект int
+
+
+class Interner:
+    """Двусторонняя таблица строка <-> целочисленный идентификатор."""
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        """Возвращает идентификатор строки, заводя новый при необходимости."""
+        index = self.ids.get(name)
+        if index is None:
+            index = len(self.names)
+            self.ids[name] = index
+            self.names.append(name)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CompactGraph:
+    """Ориентированный граф с интернированными узлами и CSR-хранением рёбер."""
+
+    def __init__(self):
+        self.nodes_table = Interner()
+        self.labels_table = Interner()
+        self.relations_table = Interner()
+        self.node_labels = array("i")  # id узла -> id метки
+        # Сжатая часть: рёбра узла i лежат в indices[indptr[i]:indptr[i + 1]]
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.empty(0, dtype=np.int32)
+        self.edge_relations = np.empty(0, dtype=np.int32)
+        # Буфер ещё не слитых рёбер
+        self.pending_src = array("i")
+        self.pending_dst = array("i")
+        self.pending_rel = array("i")
+        # Входящие рёбра (indptr, источники) в том же виде; строятся при первом запросе соседей
+        self.reverse = None
+
+    # --- Интерфейс, совместимый с используемой частью nx.DiGraph ---
+
+    def add_node(self, name, label=None):
+        """Добавляет узел или обновляет его метку."""
+        node_id = self.nodes_table.intern(name)
+        label_id = self.labels_table.intern(label) if label is not None else -1
+        if node_id == len(self.node_labels):
+            self.node_labels.append(label_id)
+        elif label_id >= 0:
+            self.node_labels[node_id] = label_id
+
+    def has_node(self, name):
+        return name in self.nodes_table.ids
+
+    def add_edge(self, head, tail, relation=None):
+        """Добавляет ребро; недостающие узлы создаются без метки."""
+        if not self.has_node(head):
+            self.add_node(head)
+        if not self.has_node(tail):
+            self.add_node(tail)
+        head_id, tail_id = self.nodes_table.ids[head], self.nodes_table.ids[tail]
+        self.pending_src.append(head_id)
+        self.pending_dst.append(tail_id)
+        self.pending_rel.append(self.relations_table.intern(relation) if relation is not None else -1)
+        self._compact_if_full()
+
+    def has_edge(self, head, tail):
+        head_id = self.nodes_table.ids.get(head)
+        tail_id = self.nodes_table.ids.get(tail)
+        if head_id is None or tail_id is None:
+            return False
+        # Буфер не сливается ради проверки, иначе чередование add_edge и has_edge квадратично;
+        # его размер ограничен порогом слияния
+        return self._find_edge(head_id, tail_id) >= 0 or self._in_pending(head_id, tail_id)
+
+    def nodes(self, data=False):
+        """Список узлов; при data=True - пары (имя, {"label": метка})."""
+        if not data:
+            return list(self.nodes_table.names)
+        return [(name, self._node_data(node_id)) for node_id, name in enumerate(self.nodes_table.names)]
+
+    def edges(self, data=False):
+        """Список рёбер; при data=True - тройки (голова, хвост, {"relation": тип})."""
+        self.compact()
+        names = self.nodes_table.names
+        sources = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        result = []
+        for source, target, relation in zip(sources.tolist(), self.indices.tolist(), self.edge_relations.tolist()):
+            if data:
+                attrs = {"relation": self.relations_table.names[relation]} if relation >= 0 else {}
+                result.append((names[source], names[target], attrs))
+            else:
+                result.append((names[source], names[target]))
+        return result
+
+    def all_neighbors(self, name):
+        """Соседи узла по исходящим и входящим рёбрам, как nx.all_neighbors."""
+        self.compact()
+        node_id = self.nodes_table.ids[name]
+        names = self.nodes_table.names
+        neighbors = [names[target] for target in self._row(self.indptr, self.indices, node_id).tolist()]
+        indptr, sources = self._reverse_csr()
+        neighbors.extend(names[source] for source in self._row(indptr, sources, node_id).tolist())
+        return neighbors
+
+    def subgraph(self, nodes):
+        """Независимый nx.DiGraph на узлах nodes со всеми рёбрами между ними.
+
+        Просматриваются только строки CSR этих узлов, так что стоимость зависит от
+        их степеней, а не от размера графа.
+        """
+        import networkx as nx
+
+        self.compact()
+        ids = self.nodes_table.ids
+        members = sorted({ids[name] for name in nodes if name in ids})
+        member_set = set(members)
+        names, relation_names = self.nodes_table.names, self.relations_table.names
+        graph = nx.DiGraph()
+        graph.add_nodes_from((names[node_id], self._node_data(node_id)) for node_id in members)
+        for node_id in members:
+            targets = self._row(self.indptr, self.indices, node_id).tolist()
+            relations = self._row(self.indptr, self.edge_relations, node_id).tolist()
+            for target, relation in zip(targets, relations):
+                if target in member_set:
+                    attrs = {"relation": relation_names[relation]} if relation >= 0 else {}
+                    graph.add_edge(names[node_id], names[target], **attrs)
+        return graph
+
+    def node_attrs(self, name):
+        """Атрибуты узла, как graph.nodes[name] у nx.DiGraph."""
+        return self._node_data(self.nodes_table.ids[name])
+
+    def number_of_nodes(self):
+        return len(self.nodes_table)
+
+    def number_of_edges(self):
+        self.compact()
+        return len(self.indices)
+
+    def clear(self):
+        self.__init__()
+
+    def copy(self):
+        """Возвращает независимую копию графа."""
+        self.compact()
+        other = CompactGraph()
+        for table in ("nodes_table", "labels_table", "relations_table"):
+            source, target = getattr(self, table), getattr(other, table)
+            target.ids = dict(source.ids)
+            target.names = list(source.names)
+        other.node_labels = array("i", self.node_labels)
+        other.indptr = self.indptr.copy()
+        other.indices = self.indices.copy()
+        other.edge_relations = self.edge_relations.copy()
+        return other
+
+    # --- Интерфейс редактора ---
+
+    def add_to_graph(self, entities, relations):
+        """Добавляет сущности и связи; связь добавляется, только если оба узла существуют."""
+        for entity, label in entities:
+            self.add_node(entity, label=label)
+        node_ids = self.nodes_table.ids
+        for head, tail, relation in relations:
+            head_id = node_ids.get(head)
+            tail_id = node_ids.get(tail)
+            if head_id is not None and tail_id is not None:
+                self.pending_src.append(head_id)
+                self.pending_dst.append(tail_id)
+                self.pending_rel.append(self.relations_table.intern(relation))
+        self._compact_if_full()
+
+    def display_graph(self):
+        """Выводит узлы и связи графа в консоль."""
+        print("\nGraph Nodes:")
+        for node in self.nodes(data=True):
+            print(f"Node: {node}")
+
+        print("\nGraph Edges:")
+        for edge in self.edges(data=True):
+            print(f"Edge: {edge}")
+
+    def find_edges(self, relation=None, head=None, tail=None):
+        """Рёбра (голова, хвост, связь) по типу связи и/или концам, как GraphIndex.edges.
+
+        С заданной головой просматривается только её строка CSR, иначе - векторно все рёбра.
+        """
+        self.compact()
+        ids = self.nodes_table.ids
+        if any(name is not None and name not in ids for name in (head, tail)):
+            return []
+        if relation is not None and relation not in self.relations_table.ids:
+            return []
+        if head is not None:
+            head_id = ids[head]
+            if head_id >= len(self.indptr) - 1:
+                return []
+            positions = np.arange(self.indptr[head_id], self.indptr[head_id + 1])
+        else:
+            positions = np.arange(len(self.indices))
+        if tail is not None:
+            positions = positions[self.indices[positions] == ids[tail]]
+        if relation is not None:
+            positions = positions[self.edge_relations[positions] == self.relations_table.ids[relation]]
+        sources = np.searchsorted(self.indptr, positions, side="right") - 1
+        names, relations = self.nodes_table.names, self.relations_table.names
+        return [
+            (names[source], names[target], relations[rel] if rel >= 0 else None)
+            for source, target, rel in zip(
+                sources.tolist(), self.indices[positions].tolist(), self.edge_relations[positions].tolist()
+            )
+        ]
+
+    def degrees(self):
+        """Степени узлов (входящие и исходящие рёбра) массивом по id узла."""
+        self.compact()
+        node_count = len(self.nodes_table)
+        out_degree = np.zeros(node_count, dtype=np.int64)
+        out_degree[:len(self.indptr) - 1] = np.diff(self.indptr)
+        return out_degree + np.bincount(self.indices, minlength=node_count)
+
+    def top_nodes(self, n):
+        """n узлов с наибольшей степенью; при равенстве - в порядке добавления, как GraphIndex.top_nodes."""
+        order = np.argsort(-self.degrees(), kind="stable")[:n]
+        names = self.nodes_table.names
+        return [names[node_id] for node_id in order.tolist()]
+
+    def to_networkx(self):
+        """Преобразует граф в nx.DiGraph для существующего кода отрисовки."""
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.nodes(data=True))
+        graph.add_edges_from(self.edges(data=True))
+        return graph
+
+    def memory_usage(self):
+        """Объём графа в байтах: массивы, буферы с их запасом и таблицы интернирования (без самих строк)."""
+        arrays = (self.indptr, self.indices, self.edge_relations) + (self.reverse or ())
+        buffers = (self.node_labels, self.pending_src, self.pending_dst, self.pending_rel)
+        tables = (self.nodes_table, self.labels_table, self.relations_table)
+        return (sum(a.nbytes for a in arrays) + sum(map(sys.getsizeof, buffers))
+                + sum(sys.getsizeof(table.ids) + sys.getsizeof(table.names) + len(table) * INT_BYTES
+                      for table in tables))
+
+    # --- Внутреннее устройство ---
+
+    def _node_data(self, node_id):
+        label_id = self.node_labels[node_id]
+        return {"label": self.labels_table.names[label_id]} if label_id >= 0 else {}
+
+    @staticmethod
+    def _row(indptr, values, node_id):
+        """Строка CSR узла; у узлов, добавленных после слияния, она пуста."""
+        if node_id >= len(indptr) - 1:
+            return values[:0]
+        return values[indptr[node_id]:indptr[node_id + 1]]
+
+    def _reverse_csr(self):
+        """Входящие рёбра: источники рёбер в узел i лежат в sources[indptr[i]:indptr[i + 1]]."""
+        if self.reverse is None:
+            node_count = len(self.indptr) - 1
+            sources = np.repeat(np.arange(node_count, dtype=np.int32), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            indptr = np.zeros(node_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=node_count), out=indptr[1:])
+            self.reverse = (indptr, sources[order])
+        return self.reverse
+
+    def _find_edge(self, head_id, tail_id):
+        """Индекс ребра в сжатой части или -1; буфер новых рёбер не просматривается."""
+        if head_id >= len(self.indptr) - 1:
+            return -1
+        start, end = self.indptr[head_id], self.indptr[head_id + 1]
+        position = start + np.searchsorted(self.indices[start:end], tail_id)
+        if position < end and self.indices[position] == tail_id:
+            return int(position)
+        return -1
+
+    def _in_pending(self, head_id, tail_id):
+        """Есть ли ребро в буфере; просмотр векторный, буфер не больше порога слияния."""
+        if not self.pending_src:
+            return False
+        sources = np.frombuffer(self.pending_src, dtype=np.int32)
+        targets = np.frombuffer(self.pending_dst, dtype=np.int32)
+        return bool(np.any((sources == head_id) & (targets == tail_id)))
+
+    def _compact_if_full(self):
+        if len(self.pending_src) >= max(COMPACT_MIN_EDGES, len(self.indices) // 4):
+            self.compact()
+
+    def compact(self):
+        """Сливает буфер новых рёбер со сжатой частью; для повторных пар побеждает последняя связь."""
+        if not self.pending_src:
+            return
+        node_count = len(self.nodes_table)
+        old_sources = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        sources = np.concatenate([old_sources, np.frombuffer(self.pending_src, dtype=np.int32)])
+        targets = np.concatenate([self.indices, np.frombuffer(self.pending_dst, dtype=np.int32)])
+        relations = np.concatenate([self.edge_relations, np.frombuffer(self.pending_rel, dtype=np.int32)])
+
+        keys = sources.astype(np.int64) * node_count + targets
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = sorted_keys[1:] != sorted_keys[:-1]
+        order = order[is_last]
+
+        sources = sources[order]
+        self.indices = targets[order].astype(np.int32)
+        self.edge_relations = relations[order].astype(np.int32)
+        self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=node_count), out=self.indptr[1:])
+        self.pending_src = array("i")
+        self.pending_dst = array("i")
+        self.pending_rel = array("i")
+        self.reverse = None
@@ -0,0 +1,145 @@
+"""Кэш результатов извлечения с адресацией по содержимому.
+
+Первый уровень - ограниченный LRU в памяти с готовыми сущностями и связями и
+словоформами их имён.
+Второй (необязательный) уровень - каталог на диске, где хранятся результаты
+извлечения в JSON и разобранные документы SpaCy в формате DocBin.
+"""
+import hashlib
+import json
+import os
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Приводит текст к канонической форме перед вычислением ключа."""
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def make_key(*parts):
+    """Вычисляет ключ кэша как хеш от составных частей."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """LRU-кэш сущностей и связей с необязательным дисковым уровнем."""
+
+    def __init__(self, max_size=1024, cache_dir=None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        self.hits = 0  # Попадания в память
+        self.disk_hits = 0  # Результаты, найденные на диске
+        self.doc_hits = 0  # Разобранные документы, найденные на диске
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key, suffix):
+        """Путь к файлу кэша; файлы раскладываются по подкаталогам по первым символам ключа."""
+        directory = os.path.join(self.cache_dir, key[:2])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, key + suffix)
+
+    def _remember(self, key, value):
+        """Кладёт значение в LRU и вытесняет самые старые записи при переполнении."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get_result(self, key, variants=None):
+        """Возвращает (сущности, связи) по ключу или None, если результата нет.
+
+        Если передан словарь variants, в него добавляются сохранённые словоформы имён.
+        """
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            if variants is not None:
+                variants.update(value[2])
+            return list(value[0]), list(value[1])
+
+        if self.cache_dir:
+            path = self._path(key, ".json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                value = (
+                    tuple(tuple(entity) for entity in data["entities"]),
+                    tuple(tuple(relation) for relation in data["relations"]),
+                    {name: tuple(surfaces) for name, surfaces in data.get("variants", {}).items()},
+                )
+                self._remember(key, value)
+                self.disk_hits += 1
+                if variants is not None:
+                    variants.update(value[2])
+                return list(value[0]), list(value[1])
+
+        self.misses += 1
+        return None
+
+    def put_result(self, key, entities, relations, variants=None):
+        """Сохраняет результат извлечения и словоформы его имён в память и, если задан каталог, на диск."""
+        variants = {name: tuple(surfaces) for name, surfaces in (variants or {}).items()}
+        value = (tuple(entities), tuple(relations), variants)
+        self._remember(key, value)
+        if self.cache_dir:
+            data = {"entities": [list(entity) for entity in value[0]], "relations": [list(relation) for relation in value[1]],
+                    "variants": {name: list(surfaces) for name, surfaces in variants.items()}}
+            path = self._path(key, ".json")
+            tmp_path = f"{path}.{os.getpid()}.tmp"  # Своё имя у каждого процесса, пишущего в общий каталог
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def get_doc(self, key, vocab):
+        """Загружает разобранный документ из дискового кэша или возвращает None."""
+        if not self.cache_dir:
+            return None
+        path = self._path(key, ".spacy")
+        if not os.path.exists(path):
+            return None
+        from spacy.tokens import DocBin
+
+        with open(path, "rb") as f:
+            doc_bin = DocBin().from_bytes(f.read())
+        self.doc_hits += 1
+        return next(iter(doc_bin.get_docs(vocab)))
+
+    def put_doc(self, key, doc):
+        """Сохраняет разобранный документ на диск в формате DocBin."""
+        if not self.cache_dir:
+            return
+        from spacy.tokens import DocBin
+
+        doc_bin = DocBin(docs=[doc], store_user_data=False)
+        path = self._path(key, ".spacy")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(doc_bin.to_bytes())
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        """Возвращает счётчики попаданий, промахов и вытеснений."""
+        return {
+            "size": len(self._memory),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "doc_hits": self.doc_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        """Очищает уровень в памяти; дисковый кэш не трогается."""
+        self._memory.clear()
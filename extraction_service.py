@@ -0,0 +1,393 @@
+"""HTTP-сервис извлечения сущностей и связей на asyncio.
+
+Одиночные запросы не разбираются по отдельности: MicroBatcher собирает тексты
+одновременных запросов в микропакеты и передаёт их в nlp.pipe одним вызовом
+process_texts. Пакет отправляется, как только набрано max_batch_size текстов
+или первый текст прождал max_wait секунд. Разбор идёт в отдельном потоке, чтобы
+цикл событий продолжал принимать запросы, пока модель занята. Если у окна графа
+задано время жизни, устаревшие документы вытесняются и без новых запросов: раз в
+expire_interval секунд в том же потоке вызывается slide_window.
+
+Маршруты:
+    POST /extract        {"text": "..."}            -> {"entities": [...], "relations": [...]}
+    POST /extract/batch  {"texts": ["...", ...]}    -> {"results": [{...}, ...]}
+    GET  /metrics        глубина очереди, размеры пакетов, задержки и, с --profile, время этапов;
+                         с окном (--window-docs, --window-minutes) - размер графа и память окна
+    GET  /health         {"status": "ok"}
+
+Для проверки без сети есть LocalClient, который вызывает обработчик сервиса напрямую.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from extraction_cache import ExtractionCache
+from graph_merge import GraphBatch
+from profiling import configure_logging, profiler
+from sliding_window import SlidingWindow
+from term_dictionaries import TermDictionaries
+from texr_processor import SemanticObjectEditor
+
+logger = logging.getLogger(__name__)
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+    413: "Payload Too Large", 500: "Internal Server Error",
+}
+MAX_BODY_BYTES = 16 * 1024 * 1024  # Наибольшее тело запроса; больше - ответ 413 без чтения тела
+
+
+class ServiceError(Exception):
+    """Ошибка запроса, возвращаемая клиенту с кодом status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """Очередь текстов, разбираемых микропакетами в одном рабочем потоке."""
+
+    def __init__(self, editor, max_batch_size=32, max_wait=0.01, latency_window=1000, expire_interval=None):
+        self.editor = editor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait  # Сколько секунд первый текст пакета ждёт попутчиков
+        window = editor.window
+        if expire_interval is None and window is not None and window.ttl is not None:
+            expire_interval = min(window.ttl / 10, 60.0)
+        self.expire_interval = expire_interval  # Период вытеснения устаревших документов окна
+        self.queue = asyncio.Queue()
+        # Редактор и модель не потокобезопасны, поэтому поток разбора один
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.task = None
+        self.expire_task = None
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.latencies = deque(maxlen=latency_window)  # Задержки последних запросов в секундах
+        self.window_stats = None  # Размер скользящего окна графа после последнего пакета
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self.task is None:
+            self.task = loop.create_task(self.run())
+        if self.expire_task is None and self.expire_interval:
+            self.expire_task = loop.create_task(self.run_expiry())
+
+    async def stop(self):
+        for task in (self.task, self.expire_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.task = self.expire_task = None
+        self.executor.shutdown(wait=True)
+
+    async def submit(self, text):
+        """Ставит текст в очередь и ждёт результата его пакета."""
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def next_batch(self):
+        """Собирает пакет: ждёт первый текст, затем добирает до размера или до истечения max_wait."""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Всё, что уже лежит в очереди, забираем без ожидания
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            texts = [text for text, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.extract, texts)
+            except Exception as error:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            finished = time.perf_counter()
+            self.batches += 1
+            self.batched_texts += len(batch)
+            for (_, future, queued), result in zip(batch, results):
+                self.latencies.append(finished - queued)
+                if not future.done():
+                    future.set_result(result)
+
+    async def run_expiry(self):
+        """Периодически вытесняет из окна документы старше его времени жизни."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.expire_interval)
+            try:
+                await loop.run_in_executor(self.executor, self.expire)
+            except Exception:
+                logger.exception("Ошибка вытеснения документов из окна")
+
+    def expire(self):
+        """Вытесняет устаревшие документы окна в потоке разбора и обновляет статистику графа."""
+        self.editor.slide_window()
+        self.window_stats = self.editor.window_stats()
+
+    def extract(self, texts):
+        """Разбирает пакет в рабочем потоке и возвращает данные в формате generate_json.
+
+        Если у редактора есть скользящее окно, результаты пакета добавляются в его граф.
+        """
+        results = list(self.editor.process_texts(texts, batch_size=len(texts)))
+        if self.editor.window is not None:
+            batch = GraphBatch()
+            for entities, relations in results:
+                batch.add(entities, relations)
+            self.editor.merge_batch(batch)
+            # Статистика снимается здесь, в потоке разбора, а не в цикле событий
+            self.window_stats = self.editor.window_stats()
+        return [self.editor.generate_data(entities, relations) for entities, relations in results]
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(share):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(share * len(latencies)))] * 1000, 3)
+
+        metrics = {
+            "queue_depth": self.queue.qsize(),
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": percentile(1.0),
+            },
+        }
+        if self.window_stats is not None:
+            metrics["graph"] = self.window_stats
+        if profiler.enabled:
+            metrics["stages"] = profiler.snapshot()
+        return metrics
+
+
+class ExtractionService:
+    """Маршрутизация запросов к MicroBatcher и HTTP-сервер поверх asyncio."""
+
+    def __init__(self, editor=None, max_batch_size=32, max_wait=0.01, max_body_bytes=MAX_BODY_BYTES):
+        self.editor = editor or SemanticObjectEditor()
+        self.max_body_bytes = max_body_bytes
+        self.batcher = MicroBatcher(self.editor, max_batch_size=max_batch_size, max_wait=max_wait)
+        self.server = None
+
+    async def handle(self, method, path, body=b""):
+        """Обрабатывает запрос и возвращает (код ответа, словарь для JSON)."""
+        self.batcher.start()
+        try:
+            if path == "/health":
+                self.require_method(method, "GET")
+                return 200, {"status": "ok"}
+            if path == "/metrics":
+                self.require_method(method, "GET")
+                return 200, self.batcher.metrics()
+            if path == "/extract":
+                self.require_method(method, "POST")
+                text = self.parse_body(body).get("text")
+                if not isinstance(text, str):
+                    raise ServiceError(400, "Поле 'text' должно быть строкой")
+                return 200, await self.batcher.submit(text)
+            if path == "/extract/batch":
+                self.require_method(method, "POST")
+                texts = self.parse_body(body).get("texts")
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ServiceError(400, "Поле 'texts' должно быть списком строк")
+                # Тексты пакета ставятся в общую очередь и могут попасть в разные микропакеты
+                results = await asyncio.gather(*(self.batcher.submit(text) for text in texts))
+                return 200, {"results": list(results)}
+            raise ServiceError(404, f"Неизвестный путь {path}")
+        except ServiceError as error:
+            return error.status, {"error": str(error)}
+        except Exception as error:
+            logger.exception("Ошибка обработки запроса %s %s", method, path)
+            return 500, {"error": f"Ошибка обработки: {error}"}
+
+    @staticmethod
+    def require_method(method, expected):
+        if method != expected:
+            raise ServiceError(405, f"Ожидался метод {expected}")
+
+    @staticmethod
+    def parse_body(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise ServiceError(400, "Тело запроса должно быть JSON")
+        if not isinstance(data, dict):
+            raise ServiceError(400, "Тело запроса должно быть JSON-объектом")
+        return data
+
+    def content_length(self, method, headers):
+        """Длина тела запроса по заголовку Content-Length.
+
+        Без заголовка тело есть только у POST, и такой запрос отклоняется (411);
+        нечисловая или отрицательная длина - 400, больше max_body_bytes - 413.
+        """
+        value = headers.get("content-length")
+        if value is None:
+            if method == "POST":
+                raise ServiceError(411, "Не указан заголовок Content-Length")
+            return 0
+        try:
+            length = int(value)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ServiceError(400, f"Некорректный Content-Length: {value!r}")
+        if length > self.max_body_bytes:
+            raise ServiceError(413, f"Тело запроса больше {self.max_body_bytes} байт")
+        return length
+
+    async def handle_connection(self, reader, writer):
+        """Читает HTTP/1.1-запросы соединения по очереди (с поддержкой keep-alive)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    length = self.content_length(method, headers)
+                except ServiceError as error:
+                    # Тело не читается, поэтому границу следующего запроса не найти: соединение закрывается
+                    status, payload, keep_alive = error.status, {"error": str(error)}, False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle(method, target.split("?", 1)[0], body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8000):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await self.batcher.stop()
+
+
+class LocalClient:
+    """Клиент без сети: запросы передаются обработчику сервиса в том же процессе."""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def request(self, method, path, data=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8") if data is not None else b""
+        status, payload = await self.service.handle(method, path, body)
+        # Ответ проходит через JSON так же, как при обращении по HTTP
+        return status, json.loads(json.dumps(payload, ensure_ascii=False))
+
+    async def extract(self, text):
+        return await self.request("POST", "/extract", {"text": text})
+
+    async def extract_batch(self, texts):
+        return await self.request("POST", "/extract/batch", {"texts": texts})
+
+    async def metrics(self):
+        return await self.request("GET", "/metrics")
+
+
+async def serve(args):
+    cache = ExtractionCache(max_size=args.cache_size)
+    dictionaries = TermDictionaries.load(args.dictionaries) if args.dictionaries else None
+    window = None
+    if args.window_docs or args.window_minutes or args.window_nodes:
+        ttl = args.window_minutes * 60 if args.window_minutes else None
+        window = SlidingWindow(args.window_docs, ttl=ttl, max_nodes=args.window_nodes)
+    service = ExtractionService(
+        SemanticObjectEditor(cache=cache, dictionaries=dictionaries, window=window), max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000, max_body_bytes=args.max_body_bytes,
+    )
+    server = await service.start(args.host, args.port)
+    print(f"Сервис извлечения слушает http://{args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP-сервис извлечения сущностей и связей.")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес для прослушивания")
+    parser.add_argument("--port", type=int, default=8000, help="порт для прослушивания")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="наибольший размер микропакета")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="сколько миллисекунд собирать микропакет")
+    parser.add_argument("--max-body-bytes", type=int, default=MAX_BODY_BYTES,
+                        help="наибольший размер тела запроса в байтах; больше - ответ 413")
+    parser.add_argument("--cache-size", type=int, default=10000, help="размер LRU-кэша результатов в памяти")
+    parser.add_argument("--dictionaries", help="каталог словарей терминов (general.txt, question.txt, time.txt, ...)")
+    parser.add_argument("--window-docs", type=int, help="держать в графе сущности и связи последних N документов")
+    parser.add_argument("--window-minutes", type=float, help="держать в графе документы не старше T минут")
+    parser.add_argument("--window-nodes", type=int, help="вытеснять старые документы окна, пока в нём больше N сущностей")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="уровень журнала в stderr")
+    parser.add_argument("--log-json", action="store_true", help="писать журнал построчным JSON")
+    parser.add_argument("--profile", action="store_true", help="замерять этапы и отдавать их в /metrics")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level, json_format=args.log_json)
+    profiler.enable(args.profile)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
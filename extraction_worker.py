@@ -0,0 +1,101 @@
+"""Фоновая обработка текста вне потока интерфейса.
+
+Интерфейс ставит задачи через submit(), а результаты и сообщения о ходе работы
+забирает из очереди results. Новая задача вытесняет выполняющуюся: та прерывается
+на ближайшей границе этапов, а её результаты не попадают в интерфейс.
+"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Больше узлов интерфейс не рисует: показываются только самые связанные
+MAX_DRAWN_NODES = 150
+
+
+class JobCancelled(Exception):
+    """Задача вытеснена более новой."""
+
+
+class ExtractionWorker:
+    """Поток, выполняющий разбор, построение графа, JSON, сохранение и раскладку графа."""
+
+    STAGES = 4
+
+    def __init__(self, editor, results=None):
+        self.editor = editor
+        self.results = results if results is not None else queue.Queue()
+        self.requests = queue.Queue()
+        self.job_id = 0  # Номер самой свежей задачи
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, text, incremental=False, file_name=None, source_path=None):
+        """Ставит задачу в очередь и возвращает её номер; предыдущая задача отменяется.
+
+        Если задан source_path, вместо text потоково обрабатывается этот файл.
+        """
+        self.job_id += 1
+        self.requests.put((self.job_id, text, incremental, file_name, source_path))
+        return self.job_id
+
+    def check(self, job_id):
+        """Прерывает задачу, если уже поставлена более новая."""
+        if job_id != self.job_id:
+            raise JobCancelled()
+
+    def report(self, job_id, step, message):
+        """Отправляет в интерфейс сообщение о ходе работы."""
+        self.check(job_id)
+        self.results.put(("progress", job_id, (step, message)))
+
+    def run(self):
+        while True:
+            job = self.requests.get()
+            # Из накопившихся задач выполняем только самую свежую
+            while not self.requests.empty():
+                job = self.requests.get_nowait()
+            try:
+                self.results.put(("done", job[0], self.process(*job)))
+            except JobCancelled:
+                self.results.put(("cancelled", job[0], None))
+            except Exception as e:
+                logger.exception("Ошибка обработки задачи %d", job[0])
+                self.results.put(("error", job[0], str(e)))
+
+    def process(self, job_id, text, incremental, file_name, source_path=None):
+        """Выполняет все этапы обработки текста и возвращает данные для интерфейса."""
+        self.report(job_id, 0, "Разбор текста...")
+        if source_path:
+            # Файл читается фрагментами; результатом становится весь построенный граф
+            self.editor.clear_graph()
+            self.editor.create_model_from_file(
+                source_path, progress=lambda count: self.report(job_id, 0, f"Разобрано фрагментов файла: {count}")
+            )
+            entities = [(name, data["label"]) for name, data in self.editor.graph.nodes(data=True)]
+            relations = [(head, tail, data["relation"]) for head, tail, data in self.editor.graph.edges(data=True)]
+        elif incremental:
+            entities, relations = self.editor.process_text_incremental(text)
+        else:
+            self.editor.clear_graph()
+            entities, relations = self.editor.create_model_from_text(text)
+
+        self.report(job_id, 1, "Формирование JSON...")
+        # Интерфейс показывает данные деревом, а не строкой: текст JSON нужен только для файла
+        data = self.editor.generate_data(entities, relations)
+
+        if file_name:
+            self.report(job_id, 2, "Сохранение файла...")
+            self.editor.save_json_to_file(self.editor.generate_json(entities, relations), file_name=file_name)
+
+        self.report(job_id, 3, "Расчёт раскладки графа...")
+        # Интерфейс рисует копию, чтобы следующая задача могла менять граф редактора;
+        # большой граф заменяется представлением из самых связанных узлов
+        if self.editor.graph.number_of_nodes() > MAX_DRAWN_NODES:
+            graph = self.editor.top_view(MAX_DRAWN_NODES)
+        else:
+            graph = self.editor.graph.copy()
+        pos = self.editor.layout_graph(graph)
+        self.check(job_id)
+        return entities, relations, data, graph, pos
@@ -0,0 +1,145 @@
+"""Вторичные индексы семантического графа.
+
+Индексы обновляются при каждом изменении графа редактором, поэтому поиск по
+метке узла, типу связи и паре (связь, узел) стоит пропорционально размеру
+результата, а не размеру графа. Там же хранятся степени узлов и число упоминаний
+сущностей, по которым выбираются самые важные узлы для отрисовки.
+
+Индексы рёбер занимают сотни байт на ребро, поэтому для CompactGraph они не
+ведутся (edges=False): запросы к рёбрам и степени узлов такой граф считает сам
+по своим массивам.
+"""
+import heapq
+from collections import Counter
+from itertools import islice
+
+
+class GraphIndex:
+    """Индексы узлов по метке и рёбер по типу связи и концам."""
+
+    def __init__(self, edges=True):
+        self.indexes_edges = edges  # Ведутся ли индексы рёбер и степени узлов
+        self.node_labels = {}  # имя -> метка
+        self.edge_relations = {}  # (голова, хвост) -> множество типов связи
+        self.by_label = {}  # метка -> множество имён
+        self.by_relation = {}  # тип связи -> множество пар (голова, хвост)
+        self.by_relation_target = {}  # (тип связи, хвост) -> множество голов
+        self.by_relation_source = {}  # (тип связи, голова) -> множество хвостов
+        self.degree = Counter()  # имя -> число инцидентных рёбер
+        self.mentions = Counter()  # имя -> число упоминаний сущности в обработанных текстах
+
+    def add_node(self, name, label):
+        """Учитывает новый узел или смену его метки."""
+        old_label = self.node_labels.get(name)
+        if old_label == label:
+            return
+        if old_label is not None:
+            _discard(self.by_label, old_label, name)
+        self.node_labels[name] = label
+        self.by_label.setdefault(label, set()).add(name)
+
+    def remove_node(self, name):
+        """Убирает узел; инцидентные рёбра должны быть удалены отдельно."""
+        label = self.node_labels.pop(name, None)
+        if label is not None:
+            _discard(self.by_label, label, name)
+        self.degree.pop(name, None)
+        self.mentions.pop(name, None)
+
+    def add_edge(self, head, tail, relation, relations=None):
+        """Учитывает новое ребро или новые типы связи существующего.
+
+        relations - все типы связи пары (например, ключи атрибута relations ребра);
+        если не задан, у пары один тип relation. Набор типов пары заменяется целиком.
+        """
+        if not self.indexes_edges:
+            return
+        pair = (head, tail)
+        types = frozenset(relations) if relations else frozenset((relation,))
+        old_types = self.edge_relations.get(pair)
+        if old_types == types:
+            return
+        if old_types is not None:
+            self.remove_edge(head, tail)
+        self.edge_relations[pair] = types
+        for rel in types:
+            self.by_relation.setdefault(rel, set()).add(pair)
+            self.by_relation_target.setdefault((rel, tail), set()).add(head)
+            self.by_relation_source.setdefault((rel, head), set()).add(tail)
+        self.degree[head] += 1
+        self.degree[tail] += 1
+
+    def remove_edge(self, head, tail):
+        """Убирает ребро со всеми его типами связи из индексов."""
+        types = self.edge_relations.pop((head, tail), None)
+        if types is None:
+            return
+        for rel in types:
+            _discard(self.by_relation, rel, (head, tail))
+            _discard(self.by_relation_target, (rel, tail), head)
+            _discard(self.by_relation_source, (rel, head), tail)
+        for name in (head, tail):
+            self.degree[name] -= 1
+            if self.degree[name] <= 0:
+                del self.degree[name]
+
+    def count_mentions(self, names, times=1):
+        """Прибавляет (или при times < 0 вычитает) упоминания сущностей."""
+        for name in names:
+            count = self.mentions[name] + times
+            if count > 0:
+                self.mentions[name] = count
+            else:
+                del self.mentions[name]
+
+    def add_graph(self, graph):
+        """Индексирует все узлы и рёбра уже построенного графа."""
+        for name, data in graph.nodes(data=True):
+            self.add_node(name, data.get("label"))
+        for head, tail, data in graph.edges(data=True):
+            self.add_edge(head, tail, data.get("relation"), data.get("relations"))
+
+    def nodes(self, label):
+        """Имена узлов с заданной меткой."""
+        return list(self.by_label.get(label, ()))
+
+    def edges(self, relation=None, head=None, tail=None):
+        """Рёбра (голова, хвост, связь), удовлетворяющие заданным условиям."""
+        relations = [relation] if relation is not None else list(self.by_relation)
+        result = []
+        for rel in relations:
+            if head is not None and tail is not None:
+                if rel in self.edge_relations.get((head, tail), ()):
+                    result.append((head, tail, rel))
+            elif tail is not None:
+                result.extend((source, tail, rel) for source in self.by_relation_target.get((rel, tail), ()))
+            elif head is not None:
+                result.extend((head, target, rel) for target in self.by_relation_source.get((rel, head), ()))
+            else:
+                result.extend((source, target, rel) for source, target in self.by_relation.get(rel, ()))
+        return result
+
+    def top_nodes(self, n, by="degree"):
+        """n узлов с наибольшей степенью (by="degree") или числом упоминаний (by="frequency").
+
+        Выбор идёт по счётчику, где есть только узлы с ненулевой оценкой; если их
+        меньше n, список дополняется остальными узлами графа.
+        """
+        scores = {"degree": self.degree, "frequency": self.mentions}[by]
+        top = heapq.nlargest(n, (name for name in scores if name in self.node_labels), key=scores.__getitem__)
+        if len(top) < n:
+            chosen = set(top)
+            top.extend(islice((name for name in self.node_labels if name not in chosen), n - len(top)))
+        return top
+
+    def clear(self):
+        self.__init__(self.indexes_edges)
+
+
+def _discard(index, key, value):
+    """Удаляет значение из множества индекса и сам ключ, если множество опустело."""
+    values = index.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del index[key]
@@ -0,0 +1,160 @@
+"""Раскладка графа с кэшированием координат.
+
+Координаты узлов запоминаются между вызовами: при повторной раскладке уже
+размещённые узлы остаются на месте, а двигаются только новые. Небольшие графы
+раскладываются nx.spring_layout, как и раньше. Для больших графов используется
+силовой алгоритм с приближённым отталкиванием по сетке (одноуровневый Barnes-Hut):
+дальние узлы заменяются центрами масс ячеек, поэтому итерация стоит
+O(n^1.5 + рёбра), а не O(n^2).
+"""
+import networkx as nx
+import numpy as np
+
+# Начиная с этого числа узлов используется приближённый алгоритм
+LARGE_GRAPH_THRESHOLD = 500
+MAX_GRID_SIZE = 32  # Не больше 32x32 ячеек сетки
+CHUNK_SIZE = 2048  # Узлов за один векторный шаг дальнего отталкивания
+
+
+class LayoutEngine:
+    """Раскладка графа, переиспользующая координаты уже размещённых узлов."""
+
+    def __init__(self, threshold=LARGE_GRAPH_THRESHOLD, seed=42):
+        self.threshold = threshold
+        self.positions = {}  # узел -> np.array([x, y])
+        self.rng = np.random.default_rng(seed)
+
+    def layout(self, graph, iterations=None):
+        """Возвращает координаты всех узлов графа; раскладываются только новые узлы."""
+        nodes = list(graph.nodes)
+        # Узлы, которых больше нет в графе, забываются, чтобы кэш не рос бесконечно
+        present = set(nodes)
+        for node in [node for node in self.positions if node not in present]:
+            del self.positions[node]
+
+        new_nodes = [node for node in nodes if node not in self.positions]
+        if new_nodes:
+            fixed = [node for node in nodes if node in self.positions]
+            initial = self._initial_positions(graph, new_nodes)
+            if len(nodes) <= self.threshold:
+                positions = self._spring(graph, initial, fixed, iterations)
+            else:
+                positions = self._approximate(graph, nodes, initial, new_nodes, iterations)
+            for node in new_nodes:
+                self.positions[node] = np.asarray(positions[node], dtype=float)
+        return {node: self.positions[node] for node in nodes}
+
+    def clear(self):
+        """Забывает все сохранённые координаты."""
+        self.positions.clear()
+
+    def _initial_positions(self, graph, new_nodes):
+        """Начальные координаты: новый узел ставится рядом с уже размещёнными соседями."""
+        initial = dict(self.positions)
+        spread = 1.0 / max(np.sqrt(len(graph)), 1.0)
+        for node in new_nodes:
+            neighbors = [initial[other] for other in nx.all_neighbors(graph, node) if other in initial]
+            if neighbors:
+                initial[node] = np.mean(neighbors, axis=0) + self.rng.normal(0.0, spread, 2)
+            else:
+                initial[node] = self.rng.uniform(-1.0, 1.0, 2)
+        return initial
+
+    def _spring(self, graph, initial, fixed, iterations):
+        """Небольшие графы: nx.spring_layout с закреплёнными старыми узлами."""
+        if not fixed:
+            return nx.spring_layout(graph, pos=initial, k=2.0, iterations=iterations or 100, seed=42)
+        return nx.spring_layout(graph, pos=initial, fixed=fixed, k=2.0, iterations=iterations or 50, seed=42)
+
+    def _approximate(self, graph, nodes, initial, new_nodes, iterations):
+        """Большие графы: силовой алгоритм с сеточным приближением отталкивания."""
+        node_ids = {node: i for i, node in enumerate(nodes)}
+        pos = np.array([initial[node] for node in nodes], dtype=float)
+        movable = np.zeros(len(nodes), dtype=bool)
+        movable[[node_ids[node] for node in new_nodes]] = True
+        edges = np.array([(node_ids[u], node_ids[v]) for u, v in graph.edges() if u != v], dtype=np.int64)
+        edges = edges.reshape(-1, 2)
+        # Притяжение нужно считать только для рёбер, задевающих подвижные узлы
+        edges = edges[movable[edges[:, 0]] | movable[edges[:, 1]]]
+
+        steps = iterations or (50 if len(new_nodes) < len(nodes) else 100)
+        result = force_directed(pos, edges, movable, steps)
+        return {node: result[node_ids[node]] for node in new_nodes}
+
+
+def force_directed(pos, edges, movable, iterations):
+    """Алгоритм Фрюхтермана-Рейнгольда с отталкиванием через центры масс ячеек сетки."""
+    pos = pos.copy()
+    count = len(pos)
+    k = 2.0 / np.sqrt(count)  # Идеальное расстояние для квадрата [-1, 1]^2
+    # Сетка g x g с g ~ n^(1/4): дальнее (n * g^2) и ближнее (n^2 / g^2) отталкивание стоят одинаково
+    grid = int(min(MAX_GRID_SIZE, max(2, round(count ** 0.25))))
+    movable_ids = np.flatnonzero(movable)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        displacement = np.zeros((len(movable_ids), 2))
+
+        # Распределяем узлы по ячейкам сетки; границы ячеек берутся по квантилям,
+        # чтобы далёкие одиночные узлы не сгоняли остальные в несколько ячеек
+        cuts = np.quantile(pos, np.linspace(0.0, 1.0, grid + 1)[1:-1], axis=0)
+        cells = (np.searchsorted(cuts[:, 0], pos[:, 0]) * grid
+                 + np.searchsorted(cuts[:, 1], pos[:, 1]))
+        masses = np.bincount(cells, minlength=grid * grid).astype(float)
+        centers = np.zeros((grid * grid, 2))
+        np.add.at(centers, cells, pos)
+        occupied = masses > 0
+        centers[occupied] /= masses[occupied, None]
+
+        # Дальнее отталкивание от центров масс чужих ячеек
+        for start in range(0, len(movable_ids), CHUNK_SIZE):
+            chunk = movable_ids[start:start + CHUNK_SIZE]
+            weight = masses[None, :] / squared_distances(pos[chunk], centers)
+            weight[np.arange(len(chunk)), cells[chunk]] = 0.0
+            displacement[start:start + len(chunk)] += k * k * weighted_offsets(pos[chunk], centers, weight)
+
+        # Ближнее отталкивание внутри своей ячейки считается точно
+        slot = np.full(count, -1)
+        slot[movable_ids] = np.arange(len(movable_ids))
+        order = np.argsort(cells, kind="stable")
+        bounds = np.searchsorted(cells[order], np.unique(cells[movable_ids]))
+        for begin in bounds:
+            cell = cells[order[begin]]
+            end = np.searchsorted(cells[order], cell, side="right")
+            members = order[begin:end]
+            if len(members) < 2:
+                continue
+            targets = members[slot[members] >= 0]
+            for start in range(0, len(targets), CHUNK_SIZE):
+                part = targets[start:start + CHUNK_SIZE]
+                weight = 1.0 / squared_distances(pos[part], pos[members])
+                displacement[slot[part]] += k * k * weighted_offsets(pos[part], pos[members], weight)
+
+        # Притяжение вдоль рёбер
+        if len(edges):
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            dist = np.sqrt(np.maximum((delta ** 2).sum(axis=1), 1e-9))
+            pull = delta * (dist / k)[:, None]
+            full = np.zeros((count, 2))
+            np.add.at(full, edges[:, 0], -pull)
+            np.add.at(full, edges[:, 1], pull)
+            displacement += full[movable_ids]
+
+        # Смещение ограничено «температурой», которая убывает с каждой итерацией
+        length = np.sqrt(np.maximum((displacement ** 2).sum(axis=1), 1e-9))
+        pos[movable_ids] += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return pos
+
+
+def squared_distances(points, others):
+    """Матрица квадратов расстояний между точками двух наборов (не меньше 1e-9)."""
+    dx = points[:, 0, None] - others[None, :, 0]
+    dy = points[:, 1, None] - others[None, :, 1]
+    return np.maximum(dx * dx + dy * dy, 1e-9)
+
+
+def weighted_offsets(points, others, weight):
+    """Сумма weight[i, j] * (points[i] - others[j]) по j, сведённая к умножению матриц."""
+    return points * weight.sum(axis=1)[:, None] - weight @ others
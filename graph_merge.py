@@ -0,0 +1,209 @@
+"""Пакетное слияние результатов извлечения с графом.
+
+Результаты многих документов копятся в GraphBatch: имена, метки и типы связей
+интернируются в целые числа и складываются в буферы array. При слиянии буферы
+становятся массивами NumPy, и допустимость связей, число повторов каждой связи,
+последняя метка узла и документы, в которых связь встретилась впервые и в
+последний раз, считаются векторными операциями. Граф nx меняется одним вызовом
+add_nodes_from и одним add_edges_from.
+
+Итог совпадает с поочерёдным добавлением документов: у узла остаётся последняя
+метка, связь учитывается, только если оба её узла к этому моменту есть в графе, а
+атрибут relation ребра - последний тип связи пары. Кроме того, у ребра графа nx
+хранятся число повторов (count), первый и последний документ, где встретилась
+пара (first_seen, last_seen), и все типы связей пары с числом повторов каждого
+(relations).
+"""
+import gc
+from array import array
+from contextlib import contextmanager
+
+import networkx as nx
+import numpy as np
+
+
+class GraphBatch:
+    """Сущности и связи пакета документов в интернированном виде."""
+
+    def __init__(self):
+        self.names = {}  # имя -> id
+        self.labels = {}  # метка -> id
+        self.relation_types = {}  # тип связи -> id
+        self.sources = []  # номер документа в пакете -> источник
+        # Вхождения сущностей: id имени, id метки, номер документа
+        self.entity_names = array("i")
+        self.entity_labels = array("i")
+        self.entity_positions = array("i")
+        # Вхождения связей: id головы, id хвоста, id типа, номер документа
+        self.heads = array("i")
+        self.tails = array("i")
+        self.relations = array("i")
+        self.relation_positions = array("i")
+
+    def __len__(self):
+        return len(self.sources)
+
+    def add(self, entities, relations, source=None):
+        """Добавляет результат очередного документа; source - его идентификатор."""
+        position = len(self.sources)
+        self.sources.append(source)
+        names, labels, types = self.names, self.labels, self.relation_types
+        for name, label in entities:
+            self.entity_names.append(names.setdefault(name, len(names)))
+            self.entity_labels.append(labels.setdefault(label, len(labels)))
+            self.entity_positions.append(position)
+        for head, tail, relation in relations:
+            self.heads.append(names.setdefault(head, len(names)))
+            self.tails.append(names.setdefault(tail, len(names)))
+            self.relations.append(types.setdefault(relation, len(types)))
+            self.relation_positions.append(position)
+
+    def documents(self):
+        """Результаты документов пакета по порядку: (источник, сущности, связи)."""
+        names = list(self.names)
+        labels = list(self.labels)
+        types = list(self.relation_types)
+        entities = [[] for _ in self.sources]
+        relations = [[] for _ in self.sources]
+        for name, label, position in zip(self.entity_names, self.entity_labels, self.entity_positions):
+            entities[position].append((names[name], labels[label]))
+        for head, tail, relation, position in zip(self.heads, self.tails, self.relations, self.relation_positions):
+            relations[position].append((names[head], names[tail], types[relation]))
+        return list(zip(self.sources, entities, relations))
+
+    def merge_into(self, graph, index=None):
+        """Сливает пакет с графом и, если задан, с GraphIndex.
+
+        Возвращает имена добавленных или обновлённых узлов и пары (голова, хвост)
+        добавленных или обновлённых рёбер.
+        """
+        if not self.sources:
+            return [], []
+        with paused_gc():
+            return self._merge_into(graph, index)
+
+    def _merge_into(self, graph, index):
+        names = list(self.names)
+        labels = list(self.labels)
+        types = list(self.relation_types)
+        entity_names = np.asarray(self.entity_names, dtype=np.int64)
+        entity_labels = np.asarray(self.entity_labels, dtype=np.int64)
+        positions = np.asarray(self.relation_positions, dtype=np.int64)
+        node_ids, first_index, mentions = np.unique(entity_names, return_index=True, return_counts=True)
+
+        # Номер документа, где имя впервые стало узлом (номера вхождений не убывают);
+        # узлы, бывшие в графе до пакета, считаются встреченными раньше всех
+        first_seen = np.full(len(names), len(self.sources), dtype=np.int64)
+        first_seen[node_ids] = np.asarray(self.entity_positions, dtype=np.int64)[first_index]
+        first_seen[np.fromiter((graph.has_node(name) for name in names), dtype=bool, count=len(names))] = -1
+
+        # Узлы в порядке первого появления, с последней меткой и числом упоминаний
+        last_index = len(entity_names) - 1 - np.unique(entity_names[::-1], return_index=True)[1]
+        node_order = np.argsort(first_index, kind="stable")
+        nodes = [
+            (names[node], labels[label])
+            for node, label in zip(node_ids[node_order].tolist(), entity_labels[last_index][node_order].tolist())
+        ]
+
+        # Допустимы связи, оба узла которых к этому документу уже есть в графе
+        heads = np.asarray(self.heads, dtype=np.int64)
+        tails = np.asarray(self.tails, dtype=np.int64)
+        valid = (first_seen[heads] <= positions) & (first_seen[tails] <= positions)
+        heads, tails, positions = heads[valid], tails[valid], positions[valid]
+        relations = np.asarray(self.relations, dtype=np.int64)[valid]
+
+        pair_keys = heads * len(names) + tails
+        pairs, pair_first, pair_counts = np.unique(pair_keys, return_index=True, return_counts=True)
+        pair_last = len(pair_keys) - 1 - np.unique(pair_keys[::-1], return_index=True)[1]
+        type_count = max(len(types), 1)
+        triple_keys = pair_keys * type_count + relations
+        triples, triple_counts = np.unique(triple_keys, return_counts=True)
+
+        # Число повторов каждого типа связи пары
+        pair_types = [{} for _ in range(len(pairs))]
+        for row, relation, count in zip(
+            np.searchsorted(pairs, triples // type_count).tolist(),
+            (triples % type_count).tolist(),
+            triple_counts.tolist(),
+        ):
+            pair_types[row][types[relation]] = count
+
+        # Рёбра в порядке первого допустимого появления; ребро могло быть в графе,
+        # только если оба его узла существовали до пакета
+        edges = []
+        sources = self.sources
+        edge_order = np.argsort(pair_first, kind="stable")
+        pair_heads = heads[pair_first][edge_order]
+        pair_tails = tails[pair_first][edge_order]
+        known = (first_seen[pair_heads] < 0) & (first_seen[pair_tails] < 0)
+        for row, head, tail, relation, count, first, last, is_known in zip(
+            edge_order.tolist(),
+            pair_heads.tolist(),
+            pair_tails.tolist(),
+            relations[pair_last][edge_order].tolist(),
+            pair_counts[edge_order].tolist(),
+            positions[pair_first][edge_order].tolist(),
+            positions[pair_last][edge_order].tolist(),
+            known.tolist(),
+        ):
+            attrs = {
+                "relation": types[relation],
+                "count": count,
+                "first_seen": sources[first],
+                "last_seen": sources[last],
+                "relations": pair_types[row],
+            }
+            edges.append((names[head], names[tail], attrs, is_known))
+
+        if isinstance(graph, nx.Graph):
+            # У известных рёбер счётчики и типы связи складываются с прежними
+            edges = [
+                (head, tail, merge_edge_data(graph.get_edge_data(head, tail), attrs) if is_known else attrs, is_known)
+                for head, tail, attrs, is_known in edges
+            ]
+            graph.add_nodes_from((name, {"label": label}) for name, label in nodes)
+            graph.add_edges_from((head, tail, attrs) for head, tail, attrs, _ in edges)
+        else:
+            # Совместимые хранилища (CompactGraph) держат только последний тип связи пары
+            for name, label in nodes:
+                graph.add_node(name, label=label)
+            for head, tail, attrs, _ in edges:
+                graph.add_edge(head, tail, relation=attrs["relation"])
+
+        if index is not None:
+            for (name, label), count in zip(nodes, mentions[node_order].tolist()):
+                index.add_node(name, label)
+                index.count_mentions((name,), times=count)
+            for head, tail, attrs, _ in edges:
+                index.add_edge(head, tail, attrs["relation"], attrs["relations"])
+        return [name for name, _ in nodes], [(head, tail) for head, tail, _, _ in edges]
+
+
+@contextmanager
+def paused_gc():
+    """Отключает циклический сборщик мусора на время массового создания объектов.
+
+    Слияние создаёт сотни тысяч словарей и кортежей без циклических ссылок, а
+    сборщик, срабатывая по числу созданных объектов, каждый раз обходит всю кучу.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def merge_edge_data(data, attrs):
+    """Атрибуты ребра после слияния: счётчики складываются, первый источник сохраняется."""
+    if not data:
+        return attrs
+    merged = dict(attrs)
+    merged["count"] = data.get("count", 0) + attrs["count"]
+    merged["first_seen"] = data.get("first_seen", attrs["first_seen"])
+    relations = dict(data.get("relations", {}))
+    for relation, count in attrs["relations"].items():
+        relations[relation] = relations.get(relation, 0) + count
+    merged["relations"] = relations
+    return merged
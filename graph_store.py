@@ -0,0 +1,224 @@
+"""Постоянное хранилище семантического графа в SQLite.
+
+Сущности, связи и их источники (документы) хранятся в отдельных таблицах с
+индексами по имени, типу сущности и типу связи. Запись идёт пакетами: добавленные
+сущности и связи копятся в памяти и сбрасываются одной транзакцией через executemany.
+База открывается в режиме WAL, чтобы читатели не блокировали загрузку.
+
+Число повторов связи (count) - это число документов, из которых она извлечена,
+плюс число добавлений без документа. Его ведут триггеры на таблице источников
+связей, поэтому повторная загрузка того же документа count не увеличивает: перед
+записью прежние источники документа удаляются, а связи, у которых не осталось ни
+одного источника, удаляются вместе с ними. Так новый результат документа заменяет
+старый.
+"""
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entities_type ON entities(type);
+
+CREATE TABLE IF NOT EXISTS relations (
+    id INTEGER PRIMARY KEY,
+    head_id INTEGER NOT NULL REFERENCES entities(id),
+    tail_id INTEGER NOT NULL REFERENCES entities(id),
+    relation TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    UNIQUE (head_id, tail_id, relation)
+);
+CREATE INDEX IF NOT EXISTS relations_relation ON relations(relation, tail_id);
+CREATE INDEX IF NOT EXISTS relations_tail ON relations(tail_id);
+
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS entity_sources (
+    entity_id INTEGER NOT NULL,
+    document_id INTEGER NOT NULL,
+    PRIMARY KEY (entity_id, document_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS relation_sources (
+    relation_id INTEGER NOT NULL,
+    document_id INTEGER NOT NULL,
+    PRIMARY KEY (relation_id, document_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS relation_sources_document ON relation_sources(document_id);
+CREATE INDEX IF NOT EXISTS entity_sources_document ON entity_sources(document_id);
+
+CREATE TRIGGER IF NOT EXISTS relation_source_added AFTER INSERT ON relation_sources BEGIN
+    UPDATE relations SET count = count + 1 WHERE id = NEW.relation_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS relation_source_removed AFTER DELETE ON relation_sources BEGIN
+    UPDATE relations SET count = count - 1 WHERE id = OLD.relation_id;
+    DELETE FROM relations WHERE id = OLD.relation_id AND count <= 0;
+END;
+"""
+
+UPSERT_DOCUMENT = "INSERT INTO documents(source) VALUES (?) ON CONFLICT(source) DO NOTHING"
+
+UPSERT_ENTITY = """
+INSERT INTO entities(name, type) VALUES (?, ?)
+ON CONFLICT(name) DO UPDATE SET type = excluded.type
+"""
+
+# Прежний вклад документа, загружаемого повторно
+DELETE_RELATION_SOURCES = """
+DELETE FROM relation_sources WHERE document_id = (SELECT id FROM documents WHERE source = ?)
+"""
+
+DELETE_ENTITY_SOURCES = """
+DELETE FROM entity_sources WHERE document_id = (SELECT id FROM documents WHERE source = ?)
+"""
+
+# Связь добавляется, только если обе сущности уже есть в хранилище.
+# Связь без документа учитывается сразу, связь документа - триггером при записи источника
+UPSERT_RELATION = """
+INSERT INTO relations(head_id, tail_id, relation)
+SELECT h.id, t.id, ? FROM entities h, entities t WHERE h.name = ? AND t.name = ?
+ON CONFLICT(head_id, tail_id, relation) DO UPDATE SET count = count + 1
+"""
+
+INSERT_SOURCED_RELATION = """
+INSERT INTO relations(head_id, tail_id, relation, count)
+SELECT h.id, t.id, ?, 0 FROM entities h, entities t WHERE h.name = ? AND t.name = ?
+ON CONFLICT(head_id, tail_id, relation) DO NOTHING
+"""
+
+INSERT_ENTITY_SOURCE = """
+INSERT OR IGNORE INTO entity_sources(entity_id, document_id)
+SELECT e.id, d.id FROM entities e, documents d WHERE e.name = ? AND d.source = ?
+"""
+
+INSERT_RELATION_SOURCE = """
+INSERT OR IGNORE INTO relation_sources(relation_id, document_id)
+SELECT r.id, d.id FROM relations r
+JOIN entities h ON h.id = r.head_id
+JOIN entities t ON t.id = r.tail_id
+JOIN documents d ON d.source = ?
+WHERE h.name = ? AND t.name = ? AND r.relation = ?
+"""
+
+
+class SQLiteGraphStore:
+    """Семантический граф, сохраняемый между запусками в файле SQLite."""
+
+    def __init__(self, path, batch_size=10000):
+        self.path = path
+        self.batch_size = batch_size  # Число сущностей и связей в одной транзакции
+        # Соединение может использоваться из фонового потока обработки
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._documents = []
+        self._entities = []
+        self._relations = []
+        self._entity_sources = []
+        self._relation_sources = []
+
+    def add_to_graph(self, entities, relations, source=None):
+        """Ставит сущности и связи документа в очередь на запись; source - идентификатор документа."""
+        self._entities.extend(entities)
+        if source is None:
+            self._relations.extend((relation, head, tail) for head, tail, relation in relations)
+        else:
+            self._documents.append((source,))
+            self._entity_sources.extend((entity, source) for entity, _ in entities)
+            self._relation_sources.extend((source, head, tail, relation) for head, tail, relation in relations)
+        if len(self._entities) + len(self._relations) + len(self._relation_sources) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленный пакет одной транзакцией.
+
+        Источники документов, уже загруженных раньше, сначала удаляются, поэтому
+        документ, встреченный снова, заменяет свой прежний результат.
+        """
+        if not (self._entities or self._relations or self._documents):
+            return
+        with self.conn:
+            documents = list(dict.fromkeys(self._documents))
+            self.conn.executemany(DELETE_RELATION_SOURCES, documents)
+            self.conn.executemany(DELETE_ENTITY_SOURCES, documents)
+            self.conn.executemany(UPSERT_DOCUMENT, documents)
+            self.conn.executemany(UPSERT_ENTITY, self._entities)
+            self.conn.executemany(UPSERT_RELATION, self._relations)
+            self.conn.executemany(
+                INSERT_SOURCED_RELATION,
+                ((relation, head, tail) for _, head, tail, relation in self._relation_sources),
+            )
+            self.conn.executemany(INSERT_ENTITY_SOURCE, self._entity_sources)
+            self.conn.executemany(INSERT_RELATION_SOURCE, self._relation_sources)
+        self._documents = []
+        self._entities = []
+        self._relations = []
+        self._entity_sources = []
+        self._relation_sources = []
+
+    def number_of_nodes(self):
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def number_of_edges(self):
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM relations").fetchone()[0]
+
+    def nodes(self, data=False):
+        """Список сущностей; при data=True - пары (имя, {"label": тип})."""
+        self.flush()
+        rows = self.conn.execute("SELECT name, type FROM entities ORDER BY id")
+        return [(name, {"label": label}) if data else name for name, label in rows]
+
+    def edges(self, data=False):
+        """Список связей; при data=True - тройки (голова, хвост, {"relation": тип, "count": число})."""
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT h.name, t.name, r.relation, r.count FROM relations r "
+            "JOIN entities h ON h.id = r.head_id JOIN entities t ON t.id = r.tail_id ORDER BY r.id"
+        )
+        return [(head, tail, {"relation": relation, "count": count}) if data else (head, tail)
+                for head, tail, relation, count in rows]
+
+    def sources(self, head, tail, relation):
+        """Документы, из которых извлечена связь."""
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT d.source FROM relation_sources s "
+            "JOIN documents d ON d.id = s.document_id JOIN relations r ON r.id = s.relation_id "
+            "JOIN entities h ON h.id = r.head_id JOIN entities t ON t.id = r.tail_id "
+            "WHERE h.name = ? AND t.name = ? AND r.relation = ?",
+            (head, tail, relation),
+        )
+        return [source for (source,) in rows]
+
+    def display_graph(self):
+        """Выводит узлы и связи хранилища в консоль."""
+        print("\nGraph Nodes:")
+        for node in self.nodes(data=True):
+            print(f"Node: {node}")
+
+        print("\nGraph Edges:")
+        for edge in self.edges(data=True):
+            print(f"Edge: {edge}")
+
+    def to_networkx(self):
+        """Загружает граф в nx.DiGraph; при нескольких типах связи между парой остаётся последний."""
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.nodes(data=True))
+        graph.add_edges_from(self.edges(data=True))
+        return graph
+
+    def close(self):
+        """Сбрасывает очередь и закрывает базу."""
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,72 @@
+"""Представления части семантического графа для отрисовки.
+
+Большой граф целиком нечитаем и долго рисуется, поэтому отрисовка работает с
+небольшим подграфом: окрестностью сущности, самыми важными узлами или связями
+одного типа. Подграф строится обходом соседей и по индексам, так что его стоимость
+зависит от размера представления, а не всего графа. CompactGraph отдаёт соседей
+и подграф по своим массивам CSR, без преобразования в networkx. У подграфа выставлен атрибут
+graph.graph["view"], по которому редактор раскладывает его отдельно от полного графа.
+"""
+from collections import deque
+from itertools import islice
+
+import networkx as nx
+
+
+def ego_view(graph, center, radius=1, limit=200):
+    """Окрестность узла: все узлы не дальше radius шагов по рёбрам в любом направлении.
+
+    Обход в ширину останавливается, когда набрано limit узлов.
+    """
+    if not graph.has_node(center):
+        raise KeyError(f"Узел {center!r} отсутствует в графе")
+    distances = {center: 0}
+    queue = deque([center])
+    while queue and len(distances) < limit:
+        node = queue.popleft()
+        if distances[node] >= radius:
+            continue
+        for neighbor in _neighbors(graph, node):
+            if neighbor not in distances:
+                distances[neighbor] = distances[node] + 1
+                queue.append(neighbor)
+                if len(distances) >= limit:
+                    break
+    return _subgraph(graph, distances, "ego")
+
+
+def top_view(graph, nodes):
+    """Подграф на заданных (например, самых важных) узлах со всеми рёбрами между ними."""
+    return _subgraph(graph, nodes, "top")
+
+
+def relation_view(graph, edges, limit=500):
+    """Подграф из рёбер (голова, хвост, связь) одного типа; не больше limit рёбер."""
+    view = nx.DiGraph(view="relation")
+    for head, tail, relation in islice(edges, limit):
+        for node in (head, tail):
+            if not view.has_node(node):
+                view.add_node(node, **_node_attrs(graph, node))
+        view.add_edge(head, tail, relation=relation)
+    return view
+
+
+def _subgraph(graph, nodes, kind):
+    """Независимая копия подграфа с отметкой вида представления."""
+    view = graph.subgraph(nodes)
+    if isinstance(graph, nx.Graph):
+        view = view.copy()
+    view.graph["view"] = kind
+    return view
+
+
+def _neighbors(graph, node):
+    if isinstance(graph, nx.Graph):
+        return nx.all_neighbors(graph, node)
+    return graph.all_neighbors(node)
+
+
+def _node_attrs(graph, node):
+    if isinstance(graph, nx.Graph):
+        return graph.nodes[node]
+    return graph.node_attrs(node)
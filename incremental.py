@@ -0,0 +1,165 @@
+"""Инкрементальный анализ текста по предложениям.
+
+Хранит результаты извлечения для каждого предложения и счётчики того, сколько
+предложений породили каждую сущность и связь. По разнице между старым и новым
+набором предложений определяет, какие узлы и рёбра графа нужно удалить или добавить.
+
+Если предложения дают имени разные метки или паре разные типы связи, побеждает,
+как и при полном разборе (GraphBatch), последнее упоминание: метка из последнего
+по тексту предложения, а в нём - последняя в списке его сущностей.
+"""
+import re
+from collections import Counter
+
+# Граница предложения: знак конца предложения и пробел либо перевод строки
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def split_sentences(text):
+    """Делит текст на непустые предложения без вызова парсера."""
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+class IncrementalState:
+    """Счётчики сущностей и связей по предложениям текущего текста."""
+
+    def __init__(self):
+        self.sentence_results = {}  # отпечаток предложения -> (сущности, связи)
+        self.sentence_counts = Counter()  # отпечаток -> число вхождений предложения в текст
+        self.entity_counts = Counter()  # (имя, метка) -> число предложений
+        self.relation_counts = Counter()  # (голова, хвост, связь) -> число предложений
+        # Старшинство метки или типа связи - (порядок предложения, позиция в его результате)
+        self.labels_by_name = {}  # имя -> {метка: старшинство}
+        self.relations_by_pair = {}  # (голова, хвост) -> {тип связи: старшинство}
+        self.pairs_by_name = {}  # имя -> пары (голова, хвост), в которых оно участвует
+
+    def update(self, fingerprints, touched_names, touched_pairs, index=None):
+        """Переводит счётчики на новый список предложений текста (отпечатки по порядку).
+
+        Результаты новых предложений должны уже лежать в sentence_results; результаты
+        исчезнувших удаляются. Упоминания сущностей учитываются в index, если он задан.
+        """
+        new_counts = Counter(fingerprints)
+        for fingerprint, times in (new_counts - self.sentence_counts).items():
+            self.apply(fingerprint, times, touched_names, touched_pairs)
+            if index is not None:
+                index.count_mentions((name for name, _ in self.sentence_results[fingerprint][0]), times)
+        for fingerprint, times in (self.sentence_counts - new_counts).items():
+            self.apply(fingerprint, -times, touched_names, touched_pairs)
+            if index is not None:
+                index.count_mentions((name for name, _ in self.sentence_results[fingerprint][0]), -times)
+            if fingerprint not in new_counts:
+                del self.sentence_results[fingerprint]
+        self.sentence_counts = new_counts
+        self.order_by(fingerprints, touched_names, touched_pairs)
+
+    def apply(self, fingerprint, times, touched_names, touched_pairs, order=0):
+        """Добавляет (times > 0) или убирает (times < 0) результаты предложения.
+
+        order - порядок предложения или документа для старшинства меток и типов связи.
+        """
+        entities, relations = self.sentence_results[fingerprint]
+        for position, entity in enumerate(entities):
+            name, label = entity
+            before = self.entity_counts[entity]
+            after = before + times
+            if after > 0:
+                self.entity_counts[entity] = after
+            else:
+                del self.entity_counts[entity]
+            if times > 0:
+                labels = self.labels_by_name.setdefault(name, {})
+                if before == 0 or len(labels) > 1:  # Новая метка или смена старшинства
+                    touched_names.add(name)
+                labels[label] = (order, position)
+            elif after <= 0:
+                labels = self.labels_by_name[name]
+                del labels[label]
+                if not labels:
+                    del self.labels_by_name[name]
+                touched_names.add(name)
+
+        for position, relation in enumerate(relations):
+            head, tail, relation_type = relation
+            pair = (head, tail)
+            before = self.relation_counts[relation]
+            after = before + times
+            if after > 0:
+                self.relation_counts[relation] = after
+            else:
+                del self.relation_counts[relation]
+            if times > 0:
+                types = self.relations_by_pair.setdefault(pair, {})
+                if before == 0 or len(types) > 1:
+                    touched_pairs.add(pair)
+                types[relation_type] = (order, position)
+                self.pairs_by_name.setdefault(head, set()).add(pair)
+                self.pairs_by_name.setdefault(tail, set()).add(pair)
+            elif after <= 0:
+                types = self.relations_by_pair[pair]
+                del types[relation_type]
+                if not types:
+                    del self.relations_by_pair[pair]
+                    for name in set(pair):
+                        pairs = self.pairs_by_name[name]
+                        pairs.discard(pair)
+                        if not pairs:
+                            del self.pairs_by_name[name]
+                touched_pairs.add(pair)
+
+    def order_by(self, fingerprints, touched_names, touched_pairs):
+        """Пересчитывает старшинство по порядку предложений fingerprints.
+
+        Нужно только именам с несколькими метками и парам с несколькими типами связи;
+        те из них, у кого сменилась старшая метка или тип, дописываются в touched_*.
+        """
+        names = {name: top(labels) for name, labels in self.labels_by_name.items() if len(labels) > 1}
+        pairs = {pair: top(types) for pair, types in self.relations_by_pair.items() if len(types) > 1}
+        if not names and not pairs:
+            return
+        for order, fingerprint in enumerate(fingerprints):
+            entities, relations = self.sentence_results[fingerprint]
+            for position, (name, label) in enumerate(entities):
+                if name in names:
+                    self.labels_by_name[name][label] = (order, position)
+            for position, (head, tail, relation) in enumerate(relations):
+                if (head, tail) in pairs:
+                    self.relations_by_pair[head, tail][relation] = (order, position)
+        touched_names.update(name for name, label in names.items() if top(self.labels_by_name[name]) != label)
+        touched_pairs.update(pair for pair, relation in pairs.items() if top(self.relations_by_pair[pair]) != relation)
+
+    def patch_graph(self, graph, touched_names, touched_pairs, index=None):
+        """Правит граф и его индексы: меняет только затронутые узлы и рёбра."""
+        for name in touched_names:
+            labels = self.labels_by_name.get(name)
+            if labels:
+                label = top(labels)
+                graph.add_node(name, label=label)
+                if index is not None:
+                    index.add_node(name, label)
+            elif graph.has_node(name):
+                if index is not None:
+                    for head, tail in list(graph.in_edges(name)) + list(graph.out_edges(name)):
+                        index.remove_edge(head, tail)
+                    index.remove_node(name)
+                graph.remove_node(name)
+            # Рёбра узла проверяются заново: они могли появиться или исчезнуть вместе с ним
+            touched_pairs.update(self.pairs_by_name.get(name, ()))
+
+        for head, tail in touched_pairs:
+            types = self.relations_by_pair.get((head, tail))
+            if types and graph.has_node(head) and graph.has_node(tail):
+                # Как и при пакетном слиянии, у ребра хранятся все типы связи пары с числом повторов
+                relations = {relation: self.relation_counts[head, tail, relation] for relation in types}
+                graph.add_edge(head, tail, relation=top(types), relations=relations)
+                if index is not None:
+                    index.add_edge(head, tail, top(types), types)
+            elif graph.has_edge(head, tail):
+                graph.remove_edge(head, tail)
+                if index is not None:
+                    index.remove_edge(head, tail)
+
+
+def top(ranked):
+    """Метка или тип связи с наибольшим старшинством, то есть упомянутые последними."""
+    return max(ranked, key=ranked.__getitem__)
@@ -0,0 +1,304 @@
+"""Конвейерная загрузка корпуса на asyncio.
+
+Этапы чтение -> разбор пакетами -> извлечение -> слияние с графом и хранилищем ->
+выгрузка JSONL связаны ограниченными очередями asyncio.Queue. Каждый этап
+выполняет работу в своём потоке (ThreadPoolExecutor на один поток), поэтому
+чтение файла и запись результатов идут одновременно с разбором, а разбор
+следующего пакета - одновременно с правилами для предыдущего. Когда очередь
+перед медленным этапом заполнена, предыдущий этап ждёт на put: быстрое чтение
+не может набрать в памяти больше queue_size пакетов на каждую очередь.
+
+Для каждого этапа считаются документы и пакеты, время работы, время ожидания
+входа и время ожидания места в следующей очереди, а также заполненность входной
+очереди. Этап с наибольшей долей работы во времени всего прогона - узкое место.
+
+Модель и редактор не потокобезопасны, поэтому разбор и извлечение идут каждый в
+одном потоке, а кэш результатов редактора конвейер не использует. Модель
+вызывает только этап разбора: словари терминов компилируются до запуска этапов,
+а длинные тексты делятся на части и разбираются тоже на этапе разбора. Части
+длинного текста идут к извлечению группами по chunk_batch_size отдельными
+элементами очереди, так что в памяти одновременно находятся лишь несколько групп,
+а не все разобранные части текста.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from graph_merge import GraphBatch
+from profiling import profiler
+from texr_processor import LONG_TEXT_CHARS, MERGE_BATCH_DOCS, ExtractionContext, get_nlp, split_long_text
+
+DONE = None  # Признак конца потока в очереди
+
+
+class StageStats:
+    """Счётчики одного этапа конвейера."""
+
+    def __init__(self, name):
+        self.name = name
+        self.documents = 0
+        self.batches = 0
+        self.busy = 0.0  # Секунды работы в потоке этапа
+        self.waiting = 0.0  # Секунды ожидания входного пакета
+        self.blocked = 0.0  # Секунды ожидания места в следующей очереди
+        self.depth_sum = 0  # Сумма заполненности входной очереди при каждом получении пакета
+        self.depth_max = 0
+        self.capacity = 0  # Размер входной очереди
+
+    def observe_queue(self, queue):
+        """Запоминает заполненность входной очереди вместе с только что взятым пакетом."""
+        depth = queue.qsize() + 1
+        self.depth_sum += depth
+        self.depth_max = max(self.depth_max, depth)
+        self.capacity = queue.maxsize
+
+    def snapshot(self, elapsed):
+        """Пропускная способность, доли времени и заполненность очереди этапа."""
+        stats = {
+            "documents": self.documents,
+            "batches": self.batches,
+            "docs_per_s": round(self.documents / elapsed, 1) if elapsed else 0.0,
+            "busy_share": round(self.busy / elapsed, 3) if elapsed else 0.0,
+            "busy_s": round(self.busy, 3),
+            "waiting_s": round(self.waiting, 3),
+            "blocked_s": round(self.blocked, 3),
+        }
+        if self.capacity:
+            stats["queue_mean"] = round(self.depth_sum / self.batches, 2) if self.batches else 0.0
+            stats["queue_max"] = self.depth_max
+            stats["queue_size"] = self.capacity
+        return stats
+
+
+class IngestPipeline:
+    """Конвейер загрузки документов (doc_id, текст) в граф, хранилище и JsonlWriter."""
+
+    STAGES = ("read", "parse", "extract", "merge", "export")
+
+    def __init__(self, editor, writer=None, store=None, batch_size=64, queue_size=8, build_graph=True,
+                 merge_docs=MERGE_BATCH_DOCS, chunk_batch_size=8):
+        self.editor = editor
+        self.writer = writer
+        self.store = store
+        self.batch_size = batch_size
+        self.queue_size = queue_size  # Пакетов в каждой очереди между этапами
+        self.chunk_batch_size = chunk_batch_size  # Частей длинного текста в одном элементе очереди
+        self.context = None  # ExtractionContext длинного текста, части которого ещё приходят
+        self.build_graph = build_graph
+        self.merge_docs = merge_docs  # Документов в GraphBatch перед слиянием с графом
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.batch = GraphBatch()
+        self.started = None
+        self.finished = None
+
+    async def run(self, documents):
+        """Пропускает документы через все этапы и возвращает их число.
+
+        Ошибка любого этапа отменяет остальные и пробрасывается вызывающему.
+        """
+        dictionaries = self.editor.dictionaries
+        if not dictionaries.compiled:
+            # Иначе их скомпилировал бы apply_rules на этапе извлечения, вызвав модель из второго потока
+            with profiler.stage("dictionaries"):
+                dictionaries.compile(get_nlp())
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.STAGES[1:]]
+        executors = {name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=name) for name in self.STAGES}
+        stages = [
+            self.read_stage(iter(documents), queues[0], executors["read"]),
+            self.parse_stage(queues[0], queues[1], executors["parse"]),
+            self.run_stage("extract", queues[1], queues[2], self.extract, executors["extract"], count=finished),
+            self.run_stage("merge", queues[2], queues[3], self.merge, executors["merge"]),
+            self.run_stage("export", queues[3], None, self.export, executors["export"]),
+        ]
+        self.started = time.perf_counter()
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        try:
+            await asyncio.gather(*tasks)
+            # Остаток пакета сливается после того, как все документы прошли конвейер
+            if self.build_graph:
+                await asyncio.get_running_loop().run_in_executor(executors["merge"], self.flush_batch)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self.finished = time.perf_counter()
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+        return self.stats["export"].documents
+
+    async def read_stage(self, documents, outbox, executor):
+        """Читает документы пакетами по batch_size; ждёт, пока в очереди не появится место."""
+        loop = asyncio.get_running_loop()
+        stats = self.stats["read"]
+        while True:
+            start = time.perf_counter()
+            batch = await loop.run_in_executor(executor, list, islice(documents, self.batch_size))
+            stats.busy += time.perf_counter() - start
+            if not batch:
+                await outbox.put(DONE)
+                return
+            stats.documents += len(batch)
+            stats.batches += 1
+            start = time.perf_counter()
+            await outbox.put(batch)
+            stats.blocked += time.perf_counter() - start
+
+    async def run_stage(self, name, inbox, outbox, func, executor, count=len):
+        """Берёт пакеты из inbox, обрабатывает func в потоке этапа и кладёт результат в outbox.
+
+        count(пакет) - сколько документов пакет добавляет к счётчику этапа.
+        """
+        loop = asyncio.get_running_loop()
+        stats = self.stats[name]
+        while True:
+            start = time.perf_counter()
+            batch = await inbox.get()
+            stats.waiting += time.perf_counter() - start
+            if batch is DONE:
+                if outbox is not None:
+                    await outbox.put(DONE)
+                return
+            stats.observe_queue(inbox)
+            start = time.perf_counter()
+            result = await loop.run_in_executor(executor, func, batch)
+            stats.busy += time.perf_counter() - start
+            stats.documents += count(batch)
+            stats.batches += 1
+            if outbox is not None:
+                start = time.perf_counter()
+                await outbox.put(result)
+                stats.blocked += time.perf_counter() - start
+
+    async def parse_stage(self, inbox, outbox, executor):
+        """Разбирает пакеты из inbox и кладёт в outbox элементы [(doc_id, список Doc, последняя ли часть)].
+
+        Короткие тексты пакета разбираются одним вызовом nlp.pipe и у каждого одна
+        часть. Длинный текст делится split_long_text; его части разбираются группами
+        по chunk_batch_size, и каждая группа кладётся в outbox сразу после разбора.
+        """
+        loop = asyncio.get_running_loop()
+        stats = self.stats["parse"]
+
+        async def work(func, *args):
+            start = time.perf_counter()
+            result = await loop.run_in_executor(executor, func, *args)
+            stats.busy += time.perf_counter() - start
+            return result
+
+        async def put(item):
+            start = time.perf_counter()
+            await outbox.put(item)
+            stats.blocked += time.perf_counter() - start
+
+        while True:
+            start = time.perf_counter()
+            batch = await inbox.get()
+            stats.waiting += time.perf_counter() - start
+            if batch is DONE:
+                await outbox.put(DONE)
+                return
+            stats.observe_queue(inbox)
+            docs = iter(await work(self.parse, [text for _, text in batch if len(text) <= LONG_TEXT_CHARS]))
+            parsed = []
+            for doc_id, text in batch:
+                if len(text) <= LONG_TEXT_CHARS:
+                    parsed.append((doc_id, [next(docs)], True))
+                    continue
+                if parsed:  # Документы перед длинным текстом уходят первыми, чтобы сохранить порядок
+                    await put(parsed)
+                    parsed = []
+                chunks = iter(split_long_text(text))
+                group = list(islice(chunks, self.chunk_batch_size))
+                while True:
+                    next_group = list(islice(chunks, self.chunk_batch_size))
+                    await put([(doc_id, await work(self.parse, group), not next_group)])
+                    if not next_group:
+                        break
+                    group = next_group
+            if parsed:
+                await put(parsed)
+            stats.documents += len(batch)
+            stats.batches += 1
+
+    def parse(self, texts):
+        """Разбирает тексты одним вызовом nlp.pipe и возвращает список Doc."""
+        return list(profiler.timed("parse", get_nlp().pipe(texts, batch_size=len(texts) or 1)))
+
+    def extract(self, batch):
+        """Применяет правила к разобранным частям документов: [(doc_id, сущности, связи)].
+
+        Части длинного текста приходят несколькими элементами; правила пишут их в общий
+        контекст, который завершается, когда приходит последняя часть.
+        """
+        results = []
+        for doc_id, docs, last in batch:
+            if self.context is None:
+                self.context = ExtractionContext()
+            for doc in docs:
+                self.editor.apply_rules(doc, self.context)
+            if last:
+                entities, relations, _ = self.editor.finish_extraction(self.context)
+                self.context = None
+                results.append((doc_id, entities, relations))
+        return results
+
+    def merge(self, batch):
+        """Пишет результаты в хранилище и копит их в GraphBatch, сливая его с графом по merge_docs документов."""
+        for doc_id, entities, relations in batch:
+            if self.store is not None:
+                self.store.add_to_graph(entities, relations, source=doc_id)
+            if self.build_graph:
+                self.batch.add(entities, relations, source=doc_id)
+        if self.build_graph and len(self.batch) >= self.merge_docs:
+            self.flush_batch()
+        return batch
+
+    def flush_batch(self):
+        self.editor.merge_batch(self.batch)
+        self.batch = GraphBatch()
+
+    def export(self, batch):
+        """Выгружает результаты документов в JsonlWriter."""
+        if self.writer is not None:
+            for doc_id, entities, relations in batch:
+                self.writer.write_result(doc_id, self.editor.generate_data(entities, relations))
+        return batch
+
+    def snapshot(self):
+        """Статистика этапов за прогон; узкое место - этап с наибольшей долей работы."""
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started if self.started is not None else 0.0
+        stages = {name: stats.snapshot(elapsed) for name, stats in self.stats.items()}
+        bottleneck = max(stages, key=lambda name: stages[name]["busy_s"])
+        return {"elapsed_s": round(elapsed, 3), "bottleneck": bottleneck, "stages": stages}
+
+    def report(self):
+        """Таблица статистики этапов в порядке конвейера."""
+        snapshot = self.snapshot()
+        lines = [f"{'Этап':<10} {'докум.':>9} {'док/с':>10} {'работа':>8} {'ожид. входа, с':>15} "
+                 f"{'ожид. места, с':>15} {'очередь ср/макс':>16}"]
+        for name, stat in snapshot["stages"].items():
+            queue = f"{stat['queue_mean']:.1f}/{stat['queue_max']} из {stat['queue_size']}" if "queue_size" in stat else "-"
+            lines.append(
+                f"{name:<10} {stat['documents']:>9} {stat['docs_per_s']:>10.1f} {stat['busy_share']:>8.0%} "
+                f"{stat['waiting_s']:>15.2f} {stat['blocked_s']:>15.2f} {queue:>16}"
+            )
+        lines.append(f"Всего {snapshot['elapsed_s']:.2f} с; узкое место: {snapshot['bottleneck']}")
+        return "\n".join(lines)
+
+
+def finished(batch):
+    """Число документов, последние части которых есть в пакете этапа извлечения."""
+    return sum(1 for _, _, last in batch if last)
+
+
+def ingest_pipelined(documents, editor, writer=None, store=None, batch_size=64, queue_size=8, build_graph=True):
+    """Синхронная обёртка: прогоняет документы через IngestPipeline и возвращает (число, конвейер)."""
+    pipeline = IngestPipeline(
+        editor, writer=writer, store=store, batch_size=batch_size, queue_size=queue_size, build_graph=build_graph
+    )
+    count = asyncio.run(pipeline.run(documents))
+    return count, pipeline
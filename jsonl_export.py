@@ -0,0 +1,110 @@
+"""Потоковая выгрузка результатов в JSON Lines.
+
+Каждая запись - одна компактная строка JSON. Строки копятся в буфере и
+сбрасываются целыми блоками одним вызовом write, поэтому файл всегда содержит
+только законченные строки и его можно читать, не дожидаясь конца выгрузки.
+В атомарном режиме запись идёт во временный файл, который заменяет целевой при закрытии;
+при дописывании временный файл начинается с копии прежнего содержимого.
+"""
+import json
+import os
+import sys
+import tempfile
+
+from profiling import profiler
+
+
+class JsonlWriter:
+    """Буферизованная запись результатов извлечения в формате JSONL."""
+
+    def __init__(self, path, append=False, buffer_size=1 << 20, atomic=False, per_item=False):
+        self.path = path
+        self.buffer_size = buffer_size  # Порог сброса буфера в байтах
+        self.atomic = atomic
+        self.per_item = per_item  # Одна строка на сущность/связь вместо строки на документ
+        self.records = 0
+        self._buffer = []
+        self._buffered = 0
+        self._tmp_path = None
+
+        if path == "-":
+            self._fd = sys.stdout.fileno()
+            self._owns_fd = False
+        elif atomic:
+            directory = os.path.dirname(os.path.abspath(path))
+            self._fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=".jsonl-", suffix=".tmp")
+            os.chmod(self._tmp_path, 0o644)
+            self._owns_fd = True
+            if append and os.path.exists(path):
+                # Иначе подмена целевого файла уничтожила бы прежние результаты
+                with open(path, "rb") as existing:
+                    for block in iter(lambda: existing.read(self.buffer_size), b""):
+                        self._write_all(block)
+        else:
+            flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (0 if append else os.O_TRUNC)
+            self._fd = os.open(path, flags, 0o644)
+            self._owns_fd = True
+
+    def write(self, record):
+        """Добавляет запись в буфер и сбрасывает его при переполнении."""
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.records += 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def write_result(self, doc_id, data):
+        """Записывает результат generate_data для документа: целиком или по строке на сущность и связь."""
+        with profiler.stage("json"):
+            if not self.per_item:
+                self.write({"id": doc_id, **data})
+                return
+            for entity in data["entities"]:
+                self.write({"id": doc_id, "kind": "entity", **entity})
+            for relation in data["relations"]:
+                self.write({"id": doc_id, "kind": "relation", **relation})
+
+    def flush(self):
+        """Сбрасывает накопленные строки на диск одним блоком."""
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        self._write_all(data)
+
+    def _write_all(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+
+    def close(self):
+        """Сбрасывает буфер и закрывает файл; в атомарном режиме подменяет целевой файл."""
+        self.flush()
+        if not self._owns_fd:
+            return
+        if self.atomic:
+            os.fsync(self._fd)
+        os.close(self._fd)
+        self._owns_fd = False
+        if self.atomic:
+            os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Закрывает файл без подмены: незавершённая атомарная выгрузка удаляется."""
+        if self._owns_fd:
+            os.close(self._fd)
+            self._owns_fd = False
+        if self.atomic and self._tmp_path and os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.atomic:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,74 @@
+"""Потоковое чтение очень больших текстовых файлов через mmap.
+
+Файл отображается в память, а не читается целиком: границы абзацев ищутся
+регулярным выражением прямо по отображению, и в строку Python декодируется только
+текущий фрагмент. Слишком длинные абзацы делятся по концу предложения или по
+пробелу. Уже прочитанные страницы отображения периодически освобождаются
+(madvise), поэтому занятая память не растёт с размером файла.
+"""
+import mmap
+import os
+import re
+
+from incremental import split_sentences
+
+# Граница абзаца: пустая (или состоящая из пробелов) строка
+PARAGRAPH_BREAK = re.compile(rb"\n[ \t\r]*\n")
+MAX_CHUNK_BYTES = 1 << 16  # Абзацы длиннее делятся на части
+RELEASE_BYTES = 64 << 20  # Как часто освобождать прочитанные страницы
+
+
+def read_chunks(path, unit="paragraph", max_bytes=MAX_CHUNK_BYTES):
+    """Лениво отдаёт пары (id, текст) по абзацам (unit="paragraph") или предложениям (unit="sentence").
+
+    id имеет вид «файл:смещение» (для предложений - «файл:смещение:номер»), где
+    смещение - позиция фрагмента в байтах от начала файла.
+    """
+    if unit not in ("paragraph", "sentence"):
+        raise ValueError(f"Неизвестная единица чтения: {unit}")
+    name = os.path.basename(path)
+    if os.path.getsize(path) == 0:  # Пустой файл нельзя отобразить в память
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        released = 0
+        for start, end in paragraph_spans(mm, max_bytes):
+            text = mm[start:end].decode("utf-8", errors="replace").lstrip("\ufeff").strip()
+            if text:
+                if unit == "paragraph":
+                    yield f"{name}:{start}", text
+                else:
+                    for number, sentence in enumerate(split_sentences(text)):
+                        yield f"{name}:{start}:{number}", sentence
+            if end - released >= RELEASE_BYTES and hasattr(mm, "madvise"):
+                # Прочитанные страницы больше не нужны; граница выравнивается по странице
+                boundary = end - end % mmap.PAGESIZE
+                mm.madvise(mmap.MADV_DONTNEED, 0, boundary)
+                released = boundary
+
+
+def paragraph_spans(mm, max_bytes):
+    """Границы (начало, конец) абзацев в байтах; длинные абзацы делятся на части не длиннее max_bytes."""
+    start = 0
+    for match in PARAGRAPH_BREAK.finditer(mm):
+        yield from split_span(mm, start, match.start(), max_bytes)
+        start = match.end()
+    yield from split_span(mm, start, len(mm), max_bytes)
+
+
+def split_span(mm, start, end, max_bytes):
+    """Делит фрагмент по концу предложения, пробелу или, в крайнем случае, по границе символа UTF-8."""
+    while end - start > max_bytes:
+        limit = start + max_bytes
+        cut = mm.rfind(b". ", start, limit)
+        if cut > start:
+            cut += 1
+        else:
+            cut = mm.rfind(b" ", start, limit)
+            if cut <= start:
+                cut = limit
+                while cut > start and mm[cut] & 0xC0 == 0x80:  # Не режем многобайтовый символ
+                    cut -= 1
+        yield start, cut
+        start = cut
+    if end > start:
+        yield start, end
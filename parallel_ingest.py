@@ -0,0 +1,103 @@
+"""Параллельная загрузка корпуса в граф по схеме map-reduce.
+
+Документы делятся на шарды, которые разбирают процессы пула. Модель SpaCy
+загружается до создания пула: при запуске через fork процессы получают её копию
+без повторной загрузки и делят память с родителем, пока не изменят её. Каждый
+процесс возвращает результаты по документам (для выгрузки) и GraphBatch шарда,
+в котором имена и связи уже интернированы в массивы. Родитель сливает пакеты в
+порядке шардов векторным GraphBatch.merge_into, поэтому итоговый граф совпадает
+с графом последовательной загрузки: у узла остаётся последняя метка, у пары
+узлов - последняя связь, а связь попадает в граф, только если оба её узла
+встретились не позже неё.
+"""
+import multiprocessing as mp
+import os
+from itertools import islice
+
+import texr_processor
+from extraction_cache import ExtractionCache
+from graph_merge import GraphBatch
+from profiling import profiler
+
+_editor = None  # Редактор процесса пула
+_batch_size = 64
+
+
+def init_worker(batch_size=64, cache_size=10000, cache_dir=None, profile=False, dictionaries=None):
+    """Готовит процесс пула; при запуске через spawn здесь же загружается модель.
+
+    dictionaries - словари терминов родительского редактора; при spawn они
+    передаются без PhraseMatcher и компилируются заново при первом документе.
+    """
+    global _editor, _batch_size
+    profiler.reset()  # После fork в профилировщике остаются замеры родителя
+    profiler.enable(profile)
+    texr_processor.get_nlp()
+    cache = ExtractionCache(max_size=cache_size, cache_dir=cache_dir) if cache_dir else None
+    _editor = texr_processor.SemanticObjectEditor(cache=cache, dictionaries=dictionaries)
+    _batch_size = batch_size
+
+
+def extract_shard(shard):
+    """Разбирает шард (номер первого документа, документы).
+
+    Возвращает результаты по документам, GraphBatch шарда, словоформы его узлов,
+    собранные процессом пула, и замеры профилировщика за время шарда.
+    """
+    _, documents = shard
+    pairs = ((text, doc_id) for doc_id, text in documents)
+    results = []
+    batch = GraphBatch()
+    for (entities, relations), doc_id in _editor.process_texts(pairs, batch_size=_batch_size, as_tuples=True):
+        results.append((doc_id, entities, relations))
+        batch.add(entities, relations, source=doc_id)
+    # Словоформы нужны только редактору, сливающему граф, поэтому процесс пула их не копит
+    variants = _editor.canonicalizer.variants
+    shard_variants = {name: variants[name] for name in batch.names if name in variants}
+    _editor.canonicalizer.clear()
+    stats = profiler.raw()
+    profiler.reset()
+    return results, batch, shard_variants, stats
+
+
+def shards(documents, shard_size):
+    """Делит поток документов на шарды (номер первого документа, список документов)."""
+    documents = iter(documents)
+    offset = 0
+    while True:
+        shard = list(islice(documents, shard_size))
+        if not shard:
+            return
+        yield offset, shard
+        offset += len(shard)
+
+
+def ingest_parallel(documents, editor, workers=None, shard_size=256, batch_size=64, writer=None, store=None,
+                    cache_size=10000, cache_dir=None):
+    """Разбирает документы в пуле процессов и сливает результаты в граф редактора.
+
+    Результаты по документам пишутся в writer (JsonlWriter) и хранилище в исходном
+    порядке. Возвращает число обработанных документов.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Модель загружается и словари компилируются до fork, чтобы процессы пула не делали этого заново
+    nlp = texr_processor.get_nlp()
+    if not editor.dictionaries.compiled:
+        editor.dictionaries.compile(nlp)
+    method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+    context = mp.get_context(method)
+
+    count = 0
+    initargs = (batch_size, cache_size, cache_dir, profiler.enabled, editor.dictionaries)
+    with context.Pool(workers, initializer=init_worker, initargs=initargs) as pool:
+        for results, batch, variants, stats in pool.imap(extract_shard, shards(documents, shard_size)):
+            for doc_id, entities, relations in results:
+                if writer is not None:
+                    writer.write_result(doc_id, editor.generate_data(entities, relations))
+                if store is not None:
+                    store.add_to_graph(entities, relations, source=doc_id)
+            editor.canonicalizer.merge(variants)
+            editor.merge_batch(batch)
+            profiler.merge(stats)
+            count += len(results)
+    return count
@@ -0,0 +1,152 @@
+"""Профилирование этапов обработки и настройка журналирования.
+
+Profiler собирает для каждого этапа (разбор, признаки, каждое семейство правил,
+слияние с графом, JSON, раскладка) число вызовов, суммарное и наибольшее время.
+Число вызовов этапа правила - это число его срабатываний. По умолчанию профилировщик
+выключен и stage() возвращает пустой контекст, так что замеры ничего не стоят.
+
+Отладочный вывод модулей идёт через logging на уровнях DEBUG и INFO и поэтому
+по умолчанию не печатается. configure_logging включает его с нужным уровнем, в
+текстовом виде или построчным JSON с полями, переданными через extra.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+# Атрибуты LogRecord, которые есть у любой записи; остальные пришли через extra
+STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+NO_STAGE = nullcontext()
+
+
+class Profiler:
+    """Таймеры и счётчики этапов обработки; потокобезопасен."""
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.calls = Counter()  # этап -> число вызовов
+        self.seconds = Counter()  # этап -> суммарное время
+        self.longest = {}  # этап -> наибольшее время одного вызова
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def stage(self, name):
+        """Контекст, замеряющий время этапа name; при выключенном профилировщике пустой."""
+        return StageTimer(self, name) if self.enabled else NO_STAGE
+
+    def timed(self, name, iterable):
+        """Итератор по iterable, в котором получение каждого элемента учитывается как вызов этапа name."""
+        return self.iterate(name, iterable) if self.enabled else iterable
+
+    def iterate(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, time.perf_counter() - start)
+            yield item
+
+    def record(self, name, seconds):
+        """Учитывает один вызов этапа длительностью seconds."""
+        with self.lock:
+            self.calls[name] += 1
+            self.seconds[name] += seconds
+            if seconds > self.longest.get(name, 0.0):
+                self.longest[name] = seconds
+
+    def merge(self, stats):
+        """Добавляет счётчики, снятые в другом процессе методом raw()."""
+        with self.lock:
+            for name, (calls, seconds, longest) in stats.items():
+                self.calls[name] += calls
+                self.seconds[name] += seconds
+                self.longest[name] = max(self.longest.get(name, 0.0), longest)
+
+    def raw(self):
+        """Счётчики в виде {этап: (вызовы, секунды, наибольшее время)} для передачи между процессами."""
+        with self.lock:
+            return {name: (self.calls[name], self.seconds[name], self.longest[name]) for name in self.calls}
+
+    def snapshot(self):
+        """Статистика этапов: число вызовов, суммарное, среднее и наибольшее время в миллисекундах."""
+        return {
+            name: {
+                "calls": calls,
+                "total_ms": round(seconds * 1000, 3),
+                "mean_ms": round(seconds * 1000 / calls, 4),
+                "max_ms": round(longest * 1000, 3),
+            }
+            for name, (calls, seconds, longest) in sorted(self.raw().items())
+        }
+
+    def report(self):
+        """Таблица статистики этапов, отсортированная по суммарному времени."""
+        stats = sorted(self.snapshot().items(), key=lambda item: -item[1]["total_ms"])
+        lines = [f"{'Этап':<24} {'вызовы':>9} {'всего, мс':>11} {'среднее, мс':>12} {'макс, мс':>10}"]
+        for name, stat in stats:
+            lines.append(
+                f"{name:<24} {stat['calls']:>9} {stat['total_ms']:>11.1f} {stat['mean_ms']:>12.3f} {stat['max_ms']:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.seconds.clear()
+            self.longest.clear()
+
+
+class StageTimer:
+    """Замер одного вызова этапа."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Общий профилировщик процесса
+profiler = Profiler()
+
+
+class JsonFormatter(logging.Formatter):
+    """Записи журнала в виде JSON, по одной на строку, с полями из extra."""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in STANDARD_ATTRS)
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_logging(level="WARNING", json_format=False, stream=None):
+    """Направляет журнал в stream (по умолчанию stderr) с уровнем level."""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if json_format:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
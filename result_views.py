@@ -0,0 +1,164 @@
+"""Виджеты Tk для просмотра результатов извлечения.
+
+Таблица сущностей или связей и дерево JSON не вставляют результат целиком:
+строки таблицы добавляются страницами по мере прокрутки, а узлы дерева создаются
+при раскрытии родителя, длинные списки тоже по страницам. Поэтому время отрисовки
+зависит от того, что пользователь видит, а не от размера результата. Фильтр по
+типу и поиск по подстроке отбирают строки в списке, и заново вставляется только
+первая страница.
+"""
+import json
+import tkinter as tk
+from itertools import islice
+from tkinter import ttk
+
+PAGE_SIZE = 200  # Строк или узлов, вставляемых за один раз
+LOAD_AHEAD = 0.9  # Следующая страница грузится, когда прокрутка прошла эту долю
+FILTER_DELAY_MS = 250  # Пауза после ввода перед применением поиска
+ALL = "Все"
+PREVIEW_ITEMS = 8  # Плоские контейнеры не больше этого размера показываются в строке целиком
+
+
+class PagedTable(ttk.Frame):
+    """Таблица строк с постраничной подгрузкой, фильтром по столбцу и поиском."""
+
+    def __init__(self, master, columns, filter_column, page_size=PAGE_SIZE):
+        super().__init__(master)
+        self.filter_column = filter_column  # Номер столбца, по значениям которого фильтрует список
+        self.page_size = page_size
+        self.rows = []
+        self.visible = []  # Строки, прошедшие фильтр
+        self.shown = 0  # Сколько строк из visible уже вставлено
+        self.pending_filter = None
+
+        controls = ttk.Frame(self)
+        controls.pack(fill=tk.X)
+        self.filter_var = tk.StringVar(value=ALL)
+        self.filter_box = ttk.Combobox(controls, textvariable=self.filter_var, state="readonly", values=[ALL])
+        self.filter_box.pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_box.bind("<<ComboboxSelected>>", lambda event: self.apply_filter())
+        self.search_var = tk.StringVar()
+        search = ttk.Entry(controls, textvariable=self.search_var)
+        search.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search.bind("<KeyRelease>", lambda event: self.schedule_filter())
+        self.count_var = tk.StringVar()
+        ttk.Label(controls, textvariable=self.count_var).pack(side=tk.RIGHT, padx=5)
+
+        self.tree = ttk.Treeview(self, columns=[name for name, _ in columns], show="headings", height=10)
+        for name, heading in columns:
+            self.tree.heading(name, text=heading)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def set_rows(self, rows):
+        """Заменяет содержимое таблицы; варианты фильтра - значения столбца filter_column."""
+        self.rows = list(rows)
+        choices = sorted({row[self.filter_column] for row in self.rows})
+        self.filter_box.configure(values=[ALL] + choices)
+        if self.filter_var.get() not in choices:
+            self.filter_var.set(ALL)
+        self.apply_filter()
+
+    def clear(self):
+        self.set_rows([])
+
+    def schedule_filter(self):
+        """Откладывает поиск до паузы в наборе, чтобы не фильтровать на каждую букву."""
+        if self.pending_filter is not None:
+            self.after_cancel(self.pending_filter)
+        self.pending_filter = self.after(FILTER_DELAY_MS, self.apply_filter)
+
+    def apply_filter(self):
+        self.pending_filter = None
+        choice = self.filter_var.get()
+        text = self.search_var.get().strip().lower()
+        column = self.filter_column
+        self.visible = [
+            row for row in self.rows
+            if (choice == ALL or row[column] == choice) and (not text or any(text in str(value).lower() for value in row))
+        ]
+        self.tree.delete(*self.tree.get_children())
+        self.shown = 0
+        self.load_page()
+        self.tree.yview_moveto(0)
+
+    def load_page(self):
+        """Вставляет следующую страницу отфильтрованных строк."""
+        end = min(self.shown + self.page_size, len(self.visible))
+        for row in self.visible[self.shown:end]:
+            self.tree.insert("", tk.END, values=row)
+        self.shown = end
+        self.count_var.set(f"{self.shown} из {len(self.visible)}")
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= LOAD_AHEAD and self.shown < len(self.visible):
+            self.load_page()
+
+
+class JsonTree(ttk.Frame):
+    """Дерево JSON, узлы которого создаются при раскрытии родителя."""
+
+    def __init__(self, master, page_size=PAGE_SIZE):
+        super().__init__(master)
+        self.page_size = page_size
+        self.values = {}  # узел дерева -> ещё не раскрытый контейнер
+        self.more = {}  # узел «ещё» -> (родитель, контейнер, с какого элемента продолжать)
+
+        self.tree = ttk.Treeview(self, columns=("value",), height=15)
+        self.tree.heading("#0", text="Ключ")
+        self.tree.heading("value", text="Значение")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+    def set_data(self, data):
+        self.clear()
+        self.add_children("", data)
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.values.clear()
+        self.more.clear()
+
+    def add_children(self, parent, value, start=0):
+        """Вставляет страницу элементов контейнера value начиная с start."""
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        end = min(start + self.page_size, len(value))
+        for key, child in islice(items, start, end):
+            item = self.tree.insert(parent, tk.END, text=str(key), values=(preview(child),))
+            if isinstance(child, (dict, list)) and child:
+                self.values[item] = child
+                self.tree.insert(item, tk.END)  # Заглушка, чтобы у узла была стрелка раскрытия
+        if end < len(value):
+            item = self.tree.insert(parent, tk.END, text=f"... ещё {len(value) - end}")
+            self.more[item] = (parent, value, end)
+
+    def on_open(self, event):
+        item = self.tree.focus()
+        value = self.values.pop(item, None)
+        if value is not None:
+            self.tree.delete(*self.tree.get_children(item))
+            self.add_children(item, value)
+
+    def on_select(self, event):
+        for item in self.tree.selection():
+            if item in self.more:
+                parent, value, start = self.more.pop(item)
+                self.tree.delete(item)
+                self.add_children(parent, value, start)
+
+
+def preview(value):
+    """Краткое представление значения для строки дерева JSON."""
+    if isinstance(value, (dict, list)):
+        children = value.values() if isinstance(value, dict) else value
+        if len(value) <= PREVIEW_ITEMS and not any(isinstance(child, (dict, list)) for child in children):
+            return json.dumps(value, ensure_ascii=False)
+        return f"{{{len(value)} ключей}}" if isinstance(value, dict) else f"[{len(value)} элементов]"
+    return json.dumps(value, ensure_ascii=False)
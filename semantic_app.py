@@ -1,11 +1,26 @@
+import os
+import queue
 import tkinter as tk
+from tkinter import filedialog
 from tkinter import ttk
 from tkinter import Scrollbar
-from text_processor import SemanticObjectEditor
+from texr_processor import SemanticObjectEditor
+from extraction_cache import ExtractionCache
+from extraction_worker import ExtractionWorker
+from result_views import JsonTree, PagedTable
+
+OUTPUT_FILE = "C:/Users/Alexandr/Desktop/testkurs/processed_text.json"
+POLL_INTERVAL_MS = 100  # Период опроса очереди результатов фонового потока
+
+
 class SemanticApp:
+    output_file = OUTPUT_FILE  # Куда сохраняется JSON результата
+
     def __init__(self, root):
         self.root = root
-        self.editor = SemanticObjectEditor()
+        self.editor = SemanticObjectEditor(cache=ExtractionCache())
+        self.results = queue.Queue()
+        self.worker = ExtractionWorker(self.editor, self.results)
 
         # Настраиваем стиль
         style = ttk.Style()
@@ -51,23 +66,47 @@ class SemanticApp:
         )
         self.process_button.pack(pady=10)
 
-        # Поле вывода формализованной модели
-        self.model_output_label = ttk.Label(self.main_frame, text="Список сущностей и связей:", style="TLabel")
-        self.model_output_label.pack(anchor="w", pady=5)
+        # Большие файлы обрабатываются потоково, без загрузки в поле ввода
+        self.file_button = ttk.Button(
+            self.main_frame,
+            text="Обработать файл...",
+            command=self.process_file,
+            style="TButton",
+        )
+        self.file_button.pack()
 
-        self.model_output = tk.Text(
-            self.main_frame, height=10, wrap=tk.WORD, font=("Arial", 12), state=tk.DISABLED, background="#f9f9f9"
+        # Инкрементальный режим: повторно разбираются только изменённые предложения
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.incremental_check = ttk.Checkbutton(
+            self.main_frame, text="Инкрементальный анализ", variable=self.incremental_var
         )
-        self.model_output.pack(fill=tk.BOTH, pady=5)
+        self.incremental_check.pack()
+
+        # Индикатор хода обработки
+        self.status_var = tk.StringVar(value="Готово")
+        self.progress = ttk.Progressbar(self.main_frame, maximum=ExtractionWorker.STAGES, mode="determinate")
+        self.progress.pack(fill=tk.X, pady=5)
+        self.status_label = ttk.Label(self.main_frame, textvariable=self.status_var)
+        self.status_label.pack(anchor="w")
 
-        # Поле вывода JSON
-        self.json_output_label = ttk.Label(self.main_frame, text="Модель в формате JSON:", style="TLabel")
-        self.json_output_label.pack(anchor="w", pady=5)
+        # Результаты: таблицы сущностей и связей и дерево JSON подгружают строки по мере просмотра
+        self.model_output_label = ttk.Label(self.main_frame, text="Список сущностей и связей:", style="TLabel")
+        self.model_output_label.pack(anchor="w", pady=5)
 
-        self.json_output = tk.Text(
-            self.main_frame, height=15, wrap=tk.WORD, font=("Arial", 12), state=tk.DISABLED, background="#f9f9f9"
+        self.results_tabs = ttk.Notebook(self.main_frame)
+        self.results_tabs.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.entity_table = PagedTable(
+            self.results_tabs, columns=[("name", "Сущность"), ("type", "Тип")], filter_column=1
+        )
+        self.relation_table = PagedTable(
+            self.results_tabs,
+            columns=[("from", "Откуда"), ("to", "Куда"), ("relation", "Связь")],
+            filter_column=2,
         )
-        self.json_output.pack(fill=tk.BOTH, pady=5)
+        self.json_tree = JsonTree(self.results_tabs)
+        self.results_tabs.add(self.entity_table, text="Сущности")
+        self.results_tabs.add(self.relation_table, text="Связи")
+        self.results_tabs.add(self.json_tree, text="JSON")
 
         # Нижняя панель кнопок
         self.button_frame = ttk.Frame(self.main_frame)
@@ -99,41 +138,59 @@ class SemanticApp:
 
 
     def process_text(self):
-        """Обрабатывает введённый текст и отображает результаты."""
+        """Отправляет введённый текст на обработку в фоновый поток."""
         text = self.text_input.get("1.0", "end-1c")
-        self.editor.clear_graph()
-        self.editor.create_model_from_text(text)
-
-        entities, relations = self.editor.process_text(text)
-        formatted_model = "Сущности:\n"
-        for entity, label in entities:
-            formatted_model += f"{entity} ({label})\n"
-        formatted_model += "\nСвязи:\n"
-        for head, tail, relation in relations:
-            formatted_model += f"{head} -[{relation}]-> {tail}\n"
-
-        self.model_output.config(state=tk.NORMAL)
-        self.model_output.delete("1.0", "end")
-        self.model_output.insert("1.0", formatted_model)
-        self.model_output.config(state=tk.DISABLED)
-
-        json_output = self.editor.generate_json(entities, relations)
-        self.json_output.config(state=tk.NORMAL)
-        self.json_output.delete("1.0", "end")
-        self.json_output.insert("1.0", json_output)
-        self.json_output.config(state=tk.DISABLED)
-        self.editor.save_json_to_file(json_output, file_name="C:/Users/Alexandr/Desktop/testkurs/processed_text.json") 
-        self.editor.visualize_graph()
+        self.worker.submit(text, incremental=self.incremental_var.get(), file_name=self.output_file)
+        self.progress["value"] = 0
+        self.status_var.set("Задача поставлена в очередь...")
+
+    def process_file(self):
+        """Отправляет на обработку текстовый файл, который читается фрагментами."""
+        path = filedialog.askopenfilename(filetypes=[("Текстовые файлы", "*.txt"), ("Все файлы", "*.*")])
+        if not path:
+            return
+        self.worker.submit(None, file_name=self.output_file, source_path=path)
+        self.progress["value"] = 0
+        self.status_var.set(f"Файл {os.path.basename(path)} поставлен в очередь...")
+
+    def poll_results(self):
+        """Забирает сообщения фонового потока; результаты устаревших задач отбрасываются."""
+        try:
+            while True:
+                kind, job_id, payload = self.results.get_nowait()
+                if job_id != self.worker.job_id:
+                    continue
+                if kind == "progress":
+                    step, message = payload
+                    self.progress["value"] = step
+                    self.status_var.set(message)
+                elif kind == "done":
+                    self.show_results(*payload)
+                elif kind == "error":
+                    self.progress["value"] = 0
+                    self.status_var.set(f"Ошибка обработки: {payload}")
+        except queue.Empty:
+            pass
+        self.root.after(POLL_INTERVAL_MS, self.poll_results)
+
+    def show_results(self, entities, relations, data, graph, pos):
+        """Отображает результаты обработки и рисует граф."""
+        # Виджеты вставляют только первую страницу; остальное подгружается при прокрутке
+        self.entity_table.set_rows(entities)
+        self.relation_table.set_rows(relations)
+        self.json_tree.set_data(data)
+
+        self.progress["value"] = ExtractionWorker.STAGES
+        self.status_var.set(f"Готово: сущностей {len(entities)}, связей {len(relations)}")
+        # Окно графа не блокирует цикл событий Tk
+        self.editor.visualize_graph(graph=graph, pos=pos, block=False)
 
     def clear_text(self):
         """Очищает все текстовые поля."""
         self.text_input.delete("1.0", "end")
-        self.model_output.config(state=tk.NORMAL)
-        self.model_output.delete("1.0", "end")
-        self.model_output.config(state=tk.DISABLED)
-        self.json_output.config(state=tk.NORMAL)
-        self.json_output.delete("1.0", "end")
-        self.json_output.config(state=tk.DISABLED)
+        self.entity_table.clear()
+        self.relation_table.clear()
+        self.json_tree.clear()
 
 
 if __name__ == "__main__":
@@ -141,4 +198,5 @@ if __name__ == "__main__":
     root.title("Редактор Семантических Объектов")
     root.geometry("900x700")
     app = SemanticApp(root)
+    app.poll_results()
     root.mainloop()
@@ -0,0 +1,123 @@
+"""Скользящее окно документов для непрерывной загрузки в граф.
+
+В режиме окна граф отражает только последние документы: не больше max_documents
+и не старше ttl секунд, а если задано max_nodes, то старые документы вытесняются,
+пока число сущностей окна не станет не больше max_nodes. Результаты документов
+учитываются счётчиками IncrementalState, как предложения в инкрементальном режиме:
+при вытеснении документа его вклад вычитается, и из графа убираются только рёбра
+и узлы, которые больше не упоминаются ни одним документом окна. Узел, который
+продолжают упоминать новые документы, остаётся в графе, поэтому вытесняются
+давно не встречавшиеся сущности. Стоимость шага зависит от размера вытесняемых и
+добавляемых документов, а не от размера графа.
+"""
+import sys
+import time
+from collections import deque
+
+from incremental import IncrementalState
+
+# Размер пустого множества и словаря; множества пар и словари меток у имён почти всегда маленькие
+SET_BYTES = sys.getsizeof(set())
+DICT_BYTES = sys.getsizeof({})
+
+
+class SlidingWindow:
+    """Документы окна в порядке поступления и счётчики их сущностей и связей."""
+
+    def __init__(self, max_documents=None, ttl=None, max_nodes=None, clock=time.monotonic):
+        self.max_documents = max_documents
+        self.ttl = ttl  # Время жизни документа в секундах
+        self.max_nodes = max_nodes
+        self.clock = clock
+        self.state = IncrementalState()
+        self.documents = deque()  # (номер документа, время добавления, байты его результатов)
+        self.next_id = 0
+        self.result_bytes = 0  # Объём списков результатов документов окна
+        self.evicted = 0  # Сколько документов вытеснено за всё время
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, entities, relations, touched_names, touched_pairs, index=None, now=None):
+        """Добавляет результат документа; затронутые имена и пары дописываются в touched_*."""
+        key = self.next_id
+        self.next_id += 1
+        entities, relations = list(entities), list(relations)
+        size = (sys.getsizeof(entities) + sys.getsizeof(relations)
+                + sum(map(sys.getsizeof, entities)) + sum(map(sys.getsizeof, relations)))
+        self.state.sentence_results[key] = (entities, relations)
+        # Номер документа растёт, поэтому старшей остаётся метка из самого нового документа
+        self.state.apply(key, 1, touched_names, touched_pairs, order=key)
+        if index is not None:
+            index.count_mentions(name for name, _ in entities)
+        self.documents.append((key, self.clock() if now is None else now, size))
+        self.result_bytes += size
+
+    def expire(self, touched_names, touched_pairs, index=None, now=None):
+        """Вытесняет старые документы сверх ограничений окна; возвращает их число."""
+        now = self.clock() if now is None else now
+        state = self.state
+        count = 0
+        while self.documents and self.is_over(now):
+            key, _, size = self.documents.popleft()
+            if index is not None:
+                index.count_mentions((name for name, _ in state.sentence_results[key][0]), -1)
+            state.apply(key, -1, touched_names, touched_pairs)
+            del state.sentence_results[key]
+            self.result_bytes -= size
+            count += 1
+        self.evicted += count
+        return count
+
+    def is_over(self, now):
+        """Нарушает ли самый старый документ ограничения окна."""
+        if self.max_documents is not None and len(self.documents) > self.max_documents:
+            return True
+        if self.ttl is not None and now - self.documents[0][1] > self.ttl:
+            return True
+        # Последний документ не вытесняется ради max_nodes, иначе окно опустеет
+        return (self.max_nodes is not None and len(self.documents) > 1
+                and len(self.state.labels_by_name) > self.max_nodes)
+
+    def patch_graph(self, graph, touched_names, touched_pairs, index=None):
+        """Правит граф и индексы по затронутым именам и парам."""
+        self.state.patch_graph(graph, touched_names, touched_pairs, index)
+
+    def memory_usage(self, variants=None):
+        """Приблизительный объём состояния окна в байтах (без строк имён, общих с графом).
+
+        variants - словарь словоформ Canonicalizer, который окно очищает вместе с графом.
+        """
+        state = self.state
+        containers = (
+            self.documents, state.sentence_results, state.entity_counts, state.relation_counts,
+            state.labels_by_name, state.relations_by_pair, state.pairs_by_name,
+        )
+        size = (sum(map(sys.getsizeof, containers)) + len(state.pairs_by_name) * SET_BYTES
+                + (len(state.labels_by_name) + len(state.relations_by_pair)) * DICT_BYTES + self.result_bytes)
+        if variants is not None:
+            size += sys.getsizeof(variants) + len(variants) * SET_BYTES
+        return size
+
+    def stats(self, graph=None, variants=None):
+        """Размер окна: документы, узлы и рёбра графа и приблизительная память в байтах."""
+        stats = {
+            "documents": len(self.documents),
+            "evicted": self.evicted,
+            "entities": len(self.state.labels_by_name),
+            "relations": len(self.state.relations_by_pair),
+            "memory_bytes": self.memory_usage(variants),
+        }
+        if variants is not None:
+            stats["variants"] = len(variants)
+        if self.documents:
+            stats["oldest_age_s"] = round(self.clock() - self.documents[0][1], 3)
+        if graph is not None:
+            stats["nodes"] = graph.number_of_nodes()
+            stats["edges"] = graph.number_of_edges()
+        return stats
+
+    def clear(self):
+        self.state = IncrementalState()
+        self.documents.clear()
+        self.result_bytes = 0
@@ -0,0 +1,178 @@
+"""Словари терминов для правил извлечения.
+
+Обобщающие термины, вопросительные слова, маркеры времени и наречия места
+хранятся в словарях, которые можно загрузить из файлов (одна запись на строку,
+строки с # - комментарии). Запись находит и своё точное написание (LOWER), и
+другие формы тех же слов (LEMMA). Исключение - словари EXACT_DICTIONARIES:
+вопросительные слова и маркеры времени ищутся только в написании записи, иначе
+«кого» и «чему» совпали бы с «кто» и «что». Однословные записи ищутся по
+таблице хешей строк SpaCy, многословные - двумя PhraseMatcher по хеш-дереву
+токенов, так что стоимость поиска на токен не зависит от размера словарей.
+
+Однословные записи считаются уже стоящими в начальной форме, а многословные
+при компиляции разбираются моделью, чтобы получить леммы каждого слова.
+"""
+import hashlib
+import os
+import re
+
+WORD = re.compile(r"\w+")  # Запись из одного слова
+
+# Словари по умолчанию: прежний встроенный набор правил
+DEFAULT_TERMS = {
+    "general": {"животные", "существо", "люди", "предметы"},  # Обобщающие термины
+    "question": {"кто", "что", "где", "как", "почему", "зачем", "когда"},  # Вопросительные слова
+    "time": {"вчера"},  # Маркеры времени
+    "location": {"здесь"},  # Наречия места
+}
+
+# Словари, записи которых ищутся только по написанию (LOWER), без других форм слов
+EXACT_DICTIONARIES = frozenset({"question", "time"})
+
+
+def read_terms(path):
+    """Записи словаря из файла: непустые строки без комментариев, в нижнем регистре."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = line.split("#", 1)[0].strip().lower()
+            if entry:
+                yield " ".join(entry.split())
+
+
+class TermDictionaries:
+    """Именованные словари терминов и скомпилированные по ним PhraseMatcher."""
+
+    def __init__(self, terms=None):
+        self.terms = {}  # имя словаря -> множество записей
+        # (хеши однословных записей по словоформе и по лемме, PhraseMatcher по словоформам и по леммам или None)
+        self.matchers = None
+        self._fingerprint = None
+        for name, entries in (terms or {}).items():
+            self.add(name, entries)
+
+    @classmethod
+    def default(cls):
+        return cls(DEFAULT_TERMS)
+
+    @classmethod
+    def load(cls, directory, defaults=True):
+        """Загружает словари из файлов <имя>.txt каталога, например general.txt и time.txt.
+
+        При defaults=True записи добавляются к словарям по умолчанию, иначе заменяют их.
+        """
+        dictionaries = cls(DEFAULT_TERMS if defaults else None)
+        for file_name in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file_name)
+            if extension == ".txt":
+                dictionaries.add(name, read_terms(os.path.join(directory, file_name)))
+        return dictionaries
+
+    def add(self, name, entries):
+        """Добавляет записи в словарь name; скомпилированные PhraseMatcher сбрасываются."""
+        terms = self.terms.setdefault(name, set())
+        for entry in entries:
+            terms.add(entry)
+            if "ё" in entry:  # В текстах «ё» часто пишут как «е»
+                terms.add(entry.replace("ё", "е"))
+        self.matchers = None
+        self._fingerprint = None
+
+    def fingerprint(self):
+        """Хеш содержимого словарей для ключей кэша; считается один раз после изменения."""
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for name in sorted(self.terms):
+                digest.update(name.encode("utf-8") + b"\x1e")
+                for entry in sorted(self.terms[name]):
+                    digest.update(entry.encode("utf-8") + b"\x1f")
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    @property
+    def compiled(self):
+        return self.matchers is not None
+
+    def compile(self, nlp):
+        """Готовит поиск по всем словарям с токенизатором и моделью nlp.
+
+        Однословные записи попадают в таблицы хешей строк SpaCy: токен проверяется по
+        словоформе и лемме двумя обращениями к словарю. Остальные записи компилируются
+        в PhraseMatcher; токенизатор запускается только для них. Записи словарей
+        EXACT_DICTIONARIES в таблицу и PhraseMatcher по леммам не попадают.
+        PhraseMatcher без шаблонов не сохраняется, и find его не запускает.
+        """
+        from spacy.matcher import PhraseMatcher
+
+        strings = nlp.vocab.strings
+        words = {}  # хеш словоформы -> имена словарей
+        lemma_words = {}  # хеш леммы -> имена словарей, в которых ищутся и другие формы
+        lower_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        lemma_matcher = PhraseMatcher(nlp.vocab, attr="LEMMA")
+        for name, entries in self.terms.items():
+            exact = name in EXACT_DICTIONARIES
+            phrases = []
+            for entry in entries:
+                if WORD.fullmatch(entry):
+                    key = strings.add(entry)
+                    words.setdefault(key, set()).add(name)
+                    if not exact:
+                        lemma_words.setdefault(key, set()).add(name)
+                else:
+                    phrases.append(entry)
+            patterns = list(nlp.tokenizer.pipe(sorted(phrases)))
+            # Леммы слов многословной записи даёт только полный разбор
+            lemma_patterns = [] if exact else list(nlp.pipe(pattern.text for pattern in patterns if len(pattern) > 1))
+            for pattern in patterns:
+                if len(pattern) == 1:  # Например, запись с дефисом, которую токенизатор не делит
+                    key = strings.add(pattern[0].lower_)
+                    words.setdefault(key, set()).add(name)
+                    if not exact:
+                        lemma_words.setdefault(key, set()).add(name)
+            lower_patterns = [pattern for pattern in patterns if len(pattern) > 1]
+            if lower_patterns:
+                lower_matcher.add(name, lower_patterns)
+            if lemma_patterns:
+                lemma_matcher.add(name, lemma_patterns)
+        # Всё присваивается разом, чтобы параллельные потоки не увидели часть
+        self.matchers = (
+            {key: tuple(names) for key, names in words.items()},
+            {key: tuple(names) for key, names in lemma_words.items()},
+            lower_matcher if len(lower_matcher) else None,
+            lemma_matcher if len(lemma_matcher) else None,
+        )
+
+    def find(self, doc):
+        """Найденные в документе термины: {имя словаря: {корень: (начало, конец)}}.
+
+        Для каждого корня (главного слова) термина остаётся самое длинное совпадение.
+        """
+        from spacy.attrs import LEMMA, LOWER
+
+        words, lemma_words, lower_matcher, lemma_matcher = self.matchers
+        found = {}
+        if words:
+            for i, (lower, lemma) in enumerate(doc.to_array([LOWER, LEMMA]).tolist()):
+                names = words.get(lower, ())
+                if lemma != lower:
+                    names += lemma_words.get(lemma, ())
+                for name in names:
+                    found.setdefault(name, {})[i] = (i, i + 1)
+        matches = set()
+        for matcher in (lower_matcher, lemma_matcher):
+            if matcher is not None:
+                matches.update(matcher(doc))
+        if matches:
+            strings = doc.vocab.strings
+            for match_id, start, end in matches:
+                spans = found.setdefault(strings[match_id], {})
+                root = doc[start:end].root.i
+                known = spans.get(root)
+                if known is None or end - start > known[1] - known[0]:
+                    spans[root] = (start, end)
+        return found
+
+    def __getstate__(self):
+        # PhraseMatcher привязан к словарю модели процесса; в другом процессе словари компилируются заново
+        state = dict(self.__dict__)
+        state["matchers"] = None
+        return state
@@ -0,0 +1,72 @@
+"""Старшинство меток и типов связи в инкрементальном режиме совпадает с полным разбором."""
+import os
+import sys
+import unittest
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph_index import GraphIndex  # noqa: E402
+from graph_merge import GraphBatch  # noqa: E402
+from incremental import IncrementalState  # noqa: E402
+
+# Результаты предложений: «мяч» - объект в одном и главная сущность в другом,
+# у пары (дети, мяч) в разных предложениях разные типы связи
+SENTENCES = {
+    "a": ([("дети", "MainEntity"), ("мяч", "Object")], [("дети", "мяч", "acts_on")]),
+    "b": ([("дети", "MainEntity"), ("мяч", "MainEntity")], [("дети", "мяч", "performs")]),
+    "c": ([("книга", "Object")], []),
+}
+
+
+def full_graph(fingerprints):
+    """Граф, который строит поочерёдное добавление результатов предложений."""
+    graph = nx.DiGraph()
+    batch = GraphBatch()
+    for fingerprint in fingerprints:
+        batch.add(*SENTENCES[fingerprint])
+    batch.merge_into(graph)
+    return graph
+
+
+class IncrementalPrecedenceTest(unittest.TestCase):
+    def setUp(self):
+        self.state = IncrementalState()
+        self.graph = nx.DiGraph()
+        self.index = GraphIndex()
+
+    def edit(self, fingerprints):
+        """Переводит состояние и граф на новый текст из предложений fingerprints."""
+        for fingerprint in fingerprints:
+            if fingerprint not in self.state.sentence_results:
+                entities, relations = SENTENCES[fingerprint]
+                self.state.sentence_results[fingerprint] = (list(entities), list(relations))
+        touched_names, touched_pairs = set(), set()
+        self.state.update(fingerprints, touched_names, touched_pairs, self.index)
+        self.state.patch_graph(self.graph, touched_names, touched_pairs, self.index)
+
+    def assert_matches_full(self, fingerprints):
+        expected = full_graph(fingerprints)
+        self.assertEqual(dict(self.graph.nodes(data="label")), dict(expected.nodes(data="label")))
+        self.assertEqual(dict(((h, t), r) for h, t, r in self.graph.edges(data="relation")),
+                         dict(((h, t), r) for h, t, r in expected.edges(data="relation")))
+        self.assertEqual(self.index.node_labels, dict(expected.nodes(data="label")))
+
+    def test_last_sentence_wins(self):
+        for text in (["a", "b"], ["b", "a"], ["b", "a", "c"], ["a", "c", "b", "a"], ["b"], ["a", "b"]):
+            self.edit(text)
+            self.assert_matches_full(text)
+        self.assertEqual(self.graph.nodes["мяч"]["label"], "MainEntity")
+        self.assertEqual(self.graph.edges["дети", "мяч"]["relation"], "performs")
+
+    def test_reorder_without_new_sentences(self):
+        self.edit(["a", "b"])
+        self.edit(["b", "a"])
+        self.assertEqual(self.graph.nodes["мяч"]["label"], "Object")
+        self.assertEqual(self.graph.edges["дети", "мяч"]["relation"], "acts_on")
+        self.assert_matches_full(["b", "a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
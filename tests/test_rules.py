@@ -0,0 +1,58 @@
+"""Вопросительные слова: поиск по написанию и наречия-атрибуты действия."""
+import os
+import sys
+import unittest
+
+import spacy
+from spacy.tokens import Doc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from texr_processor import SemanticObjectEditor  # noqa: E402
+
+NLP = spacy.blank("ru")
+
+
+def parse(words, lemmas, pos, deps, heads):
+    """Документ с заданным разбором вместо разбора моделью."""
+    return Doc(NLP.vocab, words=words, lemmas=lemmas, pos=pos, deps=deps, heads=heads)
+
+
+class QuestionRulesTest(unittest.TestCase):
+    def setUp(self):
+        self.editor = SemanticObjectEditor()
+        self.editor.dictionaries.compile(NLP)
+
+    def extract(self, *parsed):
+        entities, relations = self.editor.process_doc(parse(*parsed))
+        return set(entities), set(relations)
+
+    def test_inflected_pronoun_is_not_question_word(self):
+        entities, relations = self.extract(
+            ["Кого", "ты", "видел", "?"], ["кто", "ты", "видеть", "?"],
+            ["PRON", "PRON", "VERB", "PUNCT"], ["obj", "nsubj", "ROOT", "punct"], [2, 2, 2, 2],
+        )
+        self.assertNotIn(("кто", "Question"), entities)
+        self.assertNotIn(("Вопрос", "кто", "defines"), relations)
+
+    def test_when_is_question_and_attribute(self):
+        entities, relations = self.extract(
+            ["Когда", "ты", "придёшь", "?"], ["когда", "ты", "прийти", "?"],
+            ["ADV", "PRON", "VERB", "PUNCT"], ["advmod", "nsubj", "ROOT", "punct"], [2, 2, 2, 2],
+        )
+        self.assertIn(("когда", "Question"), entities)
+        self.assertIn(("когда", "Attribute"), entities)
+        self.assertIn(("прийти", "когда", "has_attribute"), relations)
+
+    def test_where_is_not_attribute(self):
+        entities, relations = self.extract(
+            ["Где", "ты", "живёшь", "?"], ["где", "ты", "жить", "?"],
+            ["ADV", "PRON", "VERB", "PUNCT"], ["advmod", "nsubj", "ROOT", "punct"], [2, 2, 2, 2],
+        )
+        self.assertIn(("где", "Question"), entities)
+        self.assertNotIn(("где", "Attribute"), entities)
+        self.assertNotIn(("жить", "где", "has_attribute"), relations)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,182 +1,651 @@
-import spacy
 import networkx as nx
-import matplotlib.pyplot as plt
 import json
-# Загружаем модель SpaCy
-nlp = spacy.load("ru_core_news_sm")
+import logging
+import numpy as np
+import re
+from collections import deque
+from functools import lru_cache
+
+from canonical import Canonicalizer
+from extraction_cache import make_key, normalize_text
+from graph_index import GraphIndex
+from graph_layout import LayoutEngine
+from graph_merge import GraphBatch
+from graph_views import ego_view, relation_view, top_view
+from incremental import IncrementalState, split_sentences
+from mmap_reader import read_chunks
+from profiling import profiler
+from term_dictionaries import TermDictionaries
+
+logger = logging.getLogger(__name__)
+
+# Модель SpaCy загружается лениво при первом обращении и используется всеми экземплярами.
+# Правила читают только POS, морфологию, леммы и зависимости, поэтому NER не загружаем.
+MODEL_NAME = "ru_core_news_sm"
+EXCLUDED_COMPONENTS = ["ner", "senter"]
+_nlp = None
+
+
+def get_nlp():
+    """Возвращает общую модель SpaCy, загружая её при первом вызове."""
+    global _nlp
+    if _nlp is None:
+        import spacy  # Импорт SpaCy откладывается до первой обработки текста
+        _nlp = spacy.load(MODEL_NAME, exclude=EXCLUDED_COMPONENTS)
+    return _nlp
+
+
+@lru_cache(maxsize=None)
+def model_version():
+    """Версия модели для ключей кэша; определяется без загрузки самой модели."""
+    from importlib import metadata
+
+    try:
+        return f"{MODEL_NAME}-{metadata.version(MODEL_NAME)}"
+    except metadata.PackageNotFoundError:
+        return MODEL_NAME
+
+
+# Длинные тексты разбираются частями: nlp.max_length не ограничивает длину текста,
+# а память парсера зависит от длины части, а не всего текста
+LONG_TEXT_CHARS = 100000  # Тексты длиннее разбираются по частям
+CHUNK_CHARS = 10000  # Наибольшая длина части
+PARAGRAPH_BREAK = re.compile(r"\n[ \t\r]*\n")
+SENTENCE_END = re.compile(r"[.!?…]\s+")
+
+
+def split_long_text(text, max_chars=CHUNK_CHARS):
+    """Делит текст на непрерывные части не длиннее max_chars.
+
+    Часть заканчивается на последней границе абзаца в пределах max_chars, если её нет -
+    на конце предложения, затем на пробеле и лишь в крайнем случае посреди слова.
+    """
+    start = 0
+    while len(text) - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = None
+        for pattern in (PARAGRAPH_BREAK, SENTENCE_END):
+            for match in pattern.finditer(window):
+                cut = match.end()
+            if cut:
+                break
+        if not cut:
+            cut = window.rfind(" ") + 1 or max_chars
+        if window[:cut].strip():
+            yield window[:cut]
+        start += cut
+    if text[start:].strip():
+        yield text[start:]
+
+
+# Сколько документов копится в GraphBatch перед слиянием с графом при загрузке файла
+MERGE_BATCH_DOCS = 10000
+
+# Версия правил извлечения: увеличивается при любом изменении правил, чтобы сбросить кэш
+RULES_VERSION = "6"
+
+# Вопросительные наречия, которые не считаются атрибутами действия; «когда» остаётся атрибутом
+NON_ATTRIBUTE_ADVERBS = {"кто", "что", "где", "как", "почему", "зачем"}
+
+# Реестр правил извлечения: ключ (dep, pos) -> список правил.
+# None в ключе означает «любое значение». Лексические правила хранятся по словам.
+RULES = {}
+WORD_RULES = {}
+_rule_plan = []
+_rule_sets = {}  # битовая маска правил -> список правил
+
+
+def rule(family, dep=None, pos=None, words=None, where=None):
+    """Регистрирует правило извлечения для токенов с заданными dep/pos или словами.
+
+    where - необязательный векторный фильтр: функция от DocFeatures, возвращающая
+    маску токенов, к которым правило применимо.
+    """
+    def decorator(func):
+        func.family = family
+        func.where = where
+        if words:
+            for word in words:
+                WORD_RULES.setdefault(word, []).append(func)
+        else:
+            RULES.setdefault((dep, pos), []).append(func)
+        _rule_plan.clear()
+        _rule_sets.clear()
+        return func
+    return decorator
+
+
+def rule_plan():
+    """Правила в порядке применения к токену: (правило, dep, pos, слово).
+
+    Сначала правила с точным ключом (dep, pos), затем с одним заданным полем,
+    затем общие и в конце лексические.
+    """
+    if not _rule_plan:
+        for (dep, pos), funcs in sorted(RULES.items(), key=lambda item: (item[0][0] is None, item[0][1] is None)):
+            _rule_plan.extend((func, dep, pos, None) for func in funcs)
+        for word, funcs in WORD_RULES.items():
+            _rule_plan.extend((func, None, None, word) for func in funcs)
+    return _rule_plan
+
+
+_morph_features = {}  # ключ морфологии -> {признак: значение}
+
+
+class DocFeatures:
+    """Признаки всех токенов документа в массивах NumPy.
+
+    Doc.to_array вызывается один раз на документ, строка морфологии разбирается один
+    раз на каждое различное значение. Кандидаты для правил выбираются векторными
+    масками, и объектами Token становятся только они. Термины словарей
+    (TermDictionaries) ищутся PhraseMatcher один раз на документ.
+    """
+
+    def __init__(self, doc, dictionaries=None):
+        from spacy.attrs import DEP, HEAD, LOWER, MORPH, POS
+
+        self.strings = doc.vocab.strings
+        columns = doc.to_array([DEP, POS, HEAD, LOWER, MORPH]).reshape(len(doc), 5).T
+        self.dep, self.pos, heads, self.lower, self.morph = columns
+        self.index = np.arange(len(doc))
+        self.head = self.index + heads.astype(np.int64)  # HEAD хранится как смещение от токена
+        self.imperative = self.morph_equals("Mood", "Imp")
+        self.term_spans = dictionaries.find(doc) if dictionaries is not None else {}
+        self.term_masks = {}  # (словарь, только корни) -> маска
+
+    def id(self, label):
+        """Числовой идентификатор метки dep/pos или слова, как его возвращает Doc.to_array."""
+        return self.strings[label]
+
+    def morph_equals(self, feature, value):
+        """Маска токенов, у которых морфологический признак имеет ровно одно значение value."""
+        keys, inverse = np.unique(self.morph, return_inverse=True)
+        matches = np.array([self.morph_dict(int(key)).get(feature) == value for key in keys], dtype=bool)
+        return matches[inverse.reshape(-1)] if len(keys) else np.zeros(0, dtype=bool)
+
+    def morph_dict(self, key):
+        features = _morph_features.get(key)
+        if features is None:
+            features = dict(part.split("=", 1) for part in self.strings[key].split("|") if "=" in part)
+            _morph_features[key] = features
+        return features
+
+    def terms(self, dictionary):
+        """Маска токенов, входящих в найденные термины словаря dictionary."""
+        return self.term_mask(dictionary, roots=False)
+
+    def term_roots(self, dictionary):
+        """Маска главных слов найденных терминов словаря dictionary."""
+        return self.term_mask(dictionary, roots=True)
+
+    def term_mask(self, dictionary, roots):
+        mask = self.term_masks.get((dictionary, roots))
+        if mask is None:
+            mask = np.zeros(len(self.index), dtype=bool)
+            for root, (start, end) in self.term_spans.get(dictionary, {}).items():
+                if roots:
+                    mask[root] = True
+                else:
+                    mask[start:end] = True
+            self.term_masks[dictionary, roots] = mask
+        return mask
+
+    def term_span(self, dictionary, i):
+        """Границы (начало, конец) самого длинного термина словаря с главным словом i."""
+        return self.term_spans.get(dictionary, {}).get(i, (i, i + 1))
+
+    def has_child(self, dep):
+        """Маска токенов, у которых есть зависимый с отношением dep."""
+        mask = np.zeros(len(self.index), dtype=bool)
+        mask[self.head[self.dep == self.id(dep)]] = True
+        return mask
+
+    def candidates(self):
+        """Индексы токенов, к которым применимо хотя бы одно правило, и сами правила, в порядке документа."""
+        plan = rule_plan()
+        matrix = np.ones((len(plan), len(self.index)), dtype=bool)
+        for row, (func, dep, pos, word) in zip(matrix, plan):
+            if dep is not None:
+                row &= self.dep == self.id(dep)
+            if pos is not None:
+                row &= self.pos == self.id(pos)
+            if word is not None:
+                row &= self.lower == self.id(word)
+            if func.where is not None:
+                row &= func.where(self)
+        # Набор правил токена кодируется битовой маской; одинаковые наборы разворачиваются один раз
+        codes = np.left_shift(1, np.arange(len(plan), dtype=np.int64)) @ matrix.astype(np.int64)
+        candidates = np.flatnonzero(codes)
+        for i, code in zip(candidates.tolist(), codes[candidates].tolist()):
+            funcs = _rule_sets.get(code)
+            if funcs is None:
+                funcs = _rule_sets[code] = [func for j, (func, _, _, _) in enumerate(plan) if code >> j & 1]
+            yield i, funcs
+
+
+class ExtractionContext:
+    """Накапливает результаты правил за проход по документу или по всем частям длинного текста."""
+
+    def __init__(self, features=None, canonicalizer=None):
+        self.features = features  # DocFeatures документа
+        self.canonicalizer = canonicalizer or Canonicalizer()
+        self.entities = set()
+        self.relations = set()
+        self.main_entities = {}  # каноническое имя -> является ли обобщающим термином
+        # Отложенные правила хранят имена, а не токены, поэтому контекст можно вести
+        # через несколько документов, не удерживая их в памяти
+        self.verbs = []  # Действия, которым нужны связи performs с главными сущностями
+        self.qualities = []  # Прилагательные проверяются после сбора главных сущностей
+
+    def name(self, token):
+        """Каноническое имя узла для токена."""
+        return self.canonicalizer.name(token)
+
+    def term(self, token, dictionary):
+        """Каноническое имя термина словаря dictionary с главным словом token."""
+        start, end = self.features.term_span(dictionary, token.i)
+        return self.canonicalizer.span(token.doc[start:end])
+
+    def add_main_entity(self, token):
+        """Запоминает главную сущность; обобщающий термин узнаётся по словарю general."""
+        self.main_entities[self.name(token)] = bool(self.features.terms("general")[token.i])
+
+    def add_objects(self, token, deps):
+        """Добавляет дочерние объекты действия с указанными зависимостями."""
+        for child in token.children:
+            if child.dep_ in deps:
+                self.entities.add((self.name(child), "Object"))
+                self.relations.add((self.name(token), self.name(child), "acts_on"))
+
+    def add_quality(self, token):
+        """Откладывает прилагательное до сбора всех главных сущностей."""
+        head = token.head
+        key = self.canonicalizer.key
+        self.qualities.append((key(head), head.text, key(token), token.text))
+
+    def finalize(self):
+        """Применяет правила, которым нужны результаты всего прохода."""
+        # Добавляем главные сущности
+        for entity, is_general in self.main_entities.items():
+            if is_general:
+                self.entities.add((entity, "Attribute"))
+            else:
+                self.entities.add((entity, "MainEntity"))
+
+        # Обработка прилагательных, связанных через "amod" с существительными
+        for head, head_text, quality, text in self.qualities:
+            if head in self.main_entities:
+                logger.debug("Прилагательное найдено: %s связано с %s", text, head_text, extra={"rule": "attribute"})
+                self.canonicalizer.add_variant(head, head_text.lower())
+                self.canonicalizer.add_variant(quality, text.lower())
+                self.entities.add((quality, "Attribute"))
+                self.relations.add((head, quality, "has_quality"))
+
+        # Глаголы связываются со всеми главными сущностями, кроме обобщающих
+        if self.verbs:
+            performers = [entity for entity, is_general in self.main_entities.items() if not is_general]
+            for action in self.verbs:
+                for performer in performers:
+                    self.relations.add((performer, action, "performs"))
+
+
+@rule("imperative", dep="ROOT", pos="VERB", where=lambda f: f.imperative)
+def imperative_rule(token, context):
+    """Корень-глагол в императивной форме и объекты его действия."""
+    logger.debug("Императив найден: %s", token.text, extra={"rule": "imperative"})
+    context.entities.add((context.name(token), "Action"))  # Добавляем глагол как действие
+    context.add_objects(token, ("obj", "nmod"))  # Прямые объекты и дополнения
+
+
+@rule("noun_root", dep="ROOT", pos="NOUN", where=lambda f: f.head == f.index)
+def noun_root_rule(token, context):
+    """ROOT-существительное, которое по контексту может быть действием."""
+    logger.debug("Обнаружен ROOT, который может быть действием: %s", token.text, extra={"rule": "noun_root"})
+    context.entities.add((context.name(token), "Action"))  # Интерпретируем как действие
+    context.add_objects(token, ("obj", "nmod"))
+
+
+@rule("question", where=lambda f: f.term_roots("question"))
+def question_rule(token, context):
+    """Вопросительные слова и выражения из словаря question."""
+    word = context.term(token, "question")
+    logger.debug("Вопросительное слово найдено: %s", token.text, extra={"rule": "question"})
+    context.entities.add((word, "Question"))
+    context.relations.add(("Вопрос", word, "defines"))
+    if token.head.pos_ == "VERB":  # Связываем вопросительное слово с глаголом
+        context.relations.add((word, context.name(token.head), "relates_to"))
+    elif token.dep_ == "advmod":  # Если это обстоятельство, связываем как атрибут действия
+        context.relations.add((context.name(token.head), word, "has_attribute"))
+
+
+@rule("time", where=lambda f: f.term_roots("time"))
+def time_rule(token, context):
+    """Временные маркеры из словаря time как Attribute, связанный с глаголом."""
+    word = context.term(token, "time")
+    logger.debug("Временной маркер найден: %s", token.text, extra={"rule": "time"})
+    context.entities.add((word, "Attribute"))
+    context.relations.add(("Вопрос", word, "defines"))
+    if token.head.pos_ == "VERB" or token.head.pos_ == "AUX":
+        context.relations.add((context.name(token.head), word, "has_time"))
+
+
+@rule("subject", dep="nsubj", where=lambda f: ~f.imperative[f.head])
+def subject_rule(token, context):
+    """Местоимения и существительные как субъекты (кроме субъектов императива)."""
+    context.add_main_entity(token)
+
+
+@rule("subject", dep="ROOT", pos="NOUN")
+@rule("subject", dep="ROOT", pos="PROPN")
+def root_noun_subject_rule(token, context):
+    """Существительные-корни как главные сущности."""
+    context.add_main_entity(token)
+
+
+@rule("location", dep="obl", where=lambda f: f.has_child("case") & ~f.terms("time"))
+def location_rule(token, context):
+    """Обстоятельства места: obl с предлогом, кроме маркеров времени вроде «на прошлой неделе»."""
+    cases = [child for child in token.children if child.dep_ == "case"]
+    place = context.canonicalizer.phrase(cases, token)
+    logger.debug("Обнаружено место действия: %s", place, extra={"rule": "location"})
+    context.entities.add((place, "Attribute"))
+    if token.head.pos_ == "VERB":
+        context.relations.add((context.name(token.head), place, "has_location"))
+
+
+@rule("conj", dep="conj", where=lambda f: f.pos[f.head] == f.id("VERB"))
+def conj_rule(token, context):
+    """Однородные глаголы и их субъекты."""
+    logger.debug("Обнаружено однородное действие: %s связано с %s", token.text, token.head.text, extra={"rule": "conj"})
+    action = context.name(token)
+    context.entities.add((action, "Action"))
+    context.relations.add((context.name(token.head), action, "related_action"))
+    for child in token.head.children:
+        if child.dep_ == "nsubj":
+            context.relations.add((context.name(child), action, "performs"))
+
+
+@rule("attribute", dep="amod")
+def amod_rule(token, context):
+    """Прилагательные откладываются до сбора всех главных сущностей."""
+    context.add_quality(token)
+
+
+@rule("action", pos="VERB")
+def verb_rule(token, context):
+    """Глаголы (действия) и их атрибуты."""
+    action = context.name(token)
+    context.entities.add((action, "Action"))
+    context.verbs.append(action)
+    is_imperative = context.features.imperative[token.i]
+    for child in token.children:
+        child_dep = child.dep_
+        # Если есть субъект в императивном предложении, он становится объектом
+        if child_dep == "nsubj" and is_imperative:
+            context.entities.add((context.name(child), "Object"))
+            context.relations.add((action, context.name(child), "acts_on"))
+
+        # Обработка прямых объектов (obj)
+        if child_dep in ("obj", "dobj"):
+            context.entities.add((context.name(child), "Object"))
+            context.relations.add((action, context.name(child), "acts_on"))
+
+        if child_dep == "advmod":
+            # Обработка наречий как атрибутов действия
+            if child.lower_ not in NON_ATTRIBUTE_ADVERBS:
+                context.entities.add((context.name(child), "Attribute"))
+                context.relations.add((action, context.name(child), "has_attribute"))
+
+            # Обработка наречий места из словаря location ("здесь")
+            if context.features.term_roots("location")[child.i]:
+                place = context.term(child, "location")
+                context.entities.add((place, "Attribute"))
+                context.relations.add((context.name(token.head), place, "has_location"))
+
 
 class SemanticObjectEditor:
-    def __init__(self):
-        self.graph = nx.DiGraph()  # Создаем пустой граф
-        self.general_terms = {"животные", "существо", "люди", "предметы"}  # Список обобщающих терминов
+    def __init__(self, cache=None, graph=None, store=None, dictionaries=None, window=None):
+        # Граф: новый nx.DiGraph по умолчанию или совместимое хранилище, например CompactGraph
+        self.graph = graph if graph is not None else nx.DiGraph()
+        # Словари обобщающих терминов, вопросительных слов, маркеров времени и наречий места
+        self.dictionaries = dictionaries if dictionaries is not None else TermDictionaries.default()
+        self.canonicalizer = Canonicalizer()  # Канонические имена узлов и их словоформы
+        self.cache = cache  # ExtractionCache или None, если кэширование не нужно
+        self.incremental = IncrementalState()  # Состояние инкрементального режима
+        # Весь ли граф построен инкрементальным состоянием; пустой граф ему соответствует
+        self.graph_from_incremental = graph is None
+        self.store = store  # Постоянное хранилище (SQLiteGraphStore) или None
+        self.window = window  # SlidingWindow: граф хранит только последние документы
+        if window is not None:
+            self.require_removable_graph("скользящего окна")
+        # Индексы для запросов к графу; рёбра CompactGraph не индексируются, чтобы не терять его экономию памяти
+        self.index = GraphIndex(edges=isinstance(self.graph, nx.Graph))
+        if graph is not None:
+            self.index.add_graph(graph)  # Переданный граф может быть уже заполнен
+        self.layout_engine = LayoutEngine()  # Раскладка с сохранением координат между вызовами
+        self.view_layout_engine = LayoutEngine()  # Отдельные координаты для частичных представлений
+
+    def _cache_keys(self, text):
+        """Возвращает ключ разобранного документа и ключ результата извлечения."""
+        doc_key = make_key(text, model_version())
+        result_key = make_key(doc_key, RULES_VERSION, self.dictionaries.fingerprint())
+        return doc_key, result_key
 
     def process_text(self, text):
         """Обрабатывает текст и возвращает сущности и связи."""
-        doc = nlp(text)
-        entities = set()
-        relations = set()
-
-        print("\nОтладочный вывод структуры предложения:")
-        for token in doc:
-            print(f"Токен: {token.text}, Лемма: {token.lemma_}, POS: {token.pos_}, Dep: {token.dep_}, Head: {token.head.text}, Morph: {token.morph}")
-
-        if text.strip() == "В парке дети играют в мяч, взрослые читают книги, а собаки резвятся на лужайке.":
-        # Сущности
-            entities.add(("дети", "MainEntity"))
-            entities.add(("взрослые", "MainEntity"))
-            entities.add(("собаки", "MainEntity"))
-            entities.add(("играть", "Action"))
-            entities.add(("читать", "Action"))
-            entities.add(("резвиться", "Action"))
-            entities.add(("в парке", "Attribute"))
-            entities.add(("в мяч", "Attribute"))
-            entities.add(("на лужайке", "Attribute"))
-            entities.add(("книги", "Object"))
-
-        # Связи
-            relations.add(("дети", "играть", "performs"))
-            relations.add(("играть", "в мяч", "acts_on"))
-            relations.add(("играть", "в парке", "has_location"))
-            relations.add(("взрослые", "читать", "performs"))
-            relations.add(("читать", "книги", "acts_on"))
-            relations.add(("читать", "в парке", "has_location"))
-            relations.add(("собаки", "резвиться", "performs"))
-            relations.add(("резвиться", "на лужайке", "has_location"))
-        else:
-        # Определение главных объектов (субъектов)
-            main_entities = set()
-
-        # Обработка императивных глаголов
-            for token in doc:
-            # Проверяем, является ли корень глаголом в императивной форме
-                if token.dep_ == "ROOT" and token.pos_ == "VERB" and token.morph.get("Mood") == ["Imp"]:
-                    print(f"Императив найден: {token.text}")
-                    entities.add((token.lemma_, "Action"))  # Добавляем глагол как действие
-
-                # Ищем объекты действия
-                    for child in token.children:
-                        if child.dep_ in ("obj", "nmod"):  # Прямые объекты и дополнения
-                            entities.add((child.text.lower(), "Object"))
-                            relations.add((token.lemma_, child.text.lower(), "acts_on"))
-
-        # Обработка, если ROOT - существительное, но по контексту может быть действием
-            for token in doc:
-                if token.dep_ == "ROOT" and token.pos_ == "NOUN" and token.head == token:
-                    print(f"Обнаружен ROOT, который может быть действием: {token.text}")
-                    entities.add((token.lemma_, "Action"))  # Интерпретируем как действие
-                    for child in token.children:
-                        if child.dep_ in ("obj", "nmod"):  # Обработка объектов
-                            entities.add((child.text.lower(), "Object"))
-                            relations.add((token.lemma_, child.text.lower(), "acts_on"))
-
-        # Обработка вопросительных слов
-            for token in doc:
-                if token.text.lower() in {"кто", "что", "где", "как", "почему", "зачем", "когда"}:
-                    print(f"Вопросительное слово найдено: {token.text}")
-                    entities.add((token.text.lower(), "Question"))
-                    relations.add(("Вопрос", token.text.lower(), "defines"))
-                    if token.head.pos_ == "VERB":  # Связываем вопросительное слово с глаголом
-                        relations.add((token.text.lower(), token.head.lemma_, "relates_to"))
-                    elif token.dep_ == "advmod":  # Если это обстоятельство, связываем как атрибут действия
-                        relations.add((token.head.lemma_, token.text.lower(), "has_attribute"))
-
-        # Добавляем временные маркеры как Question и Attribute
-            for token in doc:
-                if token.text.lower() == "вчера":
-                    print(f"Временной маркер найден: {token.text}")
-                # Добавляем как Question
-                    entities.add((token.text.lower(), "Attribute"))
-                    relations.add(("Вопрос", token.text.lower(), "defines"))
-                # Добавляем как Attribute, связанный с глаголом
-                    if token.head.pos_ == "VERB" or token.head.pos_ == "AUX":
-                        relations.add((token.head.lemma_, token.text.lower(), "has_time"))
-
-        # Местоимения и существительные как субъекты
-            for token in doc:
-                if token.dep_ == "nsubj" and token.head.morph.get("Mood") != ["Imp"]:
-                    main_entities.add(token.text)
+        if len(text) > LONG_TEXT_CHARS:
+            return self.process_long_text(text)
+        if self.cache is None:
+            with profiler.stage("parse"):
+                doc = get_nlp()(text)
+            return self.process_doc(doc)
+
+        text = normalize_text(text)
+        doc_key, result_key = self._cache_keys(text)
+        cached = self._cached_result(result_key)
+        if cached is not None:
+            return cached
+
+        doc = self.cache.get_doc(doc_key, get_nlp().vocab)
+        if doc is None:
+            with profiler.stage("parse"):
+                doc = get_nlp()(text)
+            self.cache.put_doc(doc_key, doc)
+        entities, relations, variants = self._extract((doc,))
+        self.cache.put_result(result_key, entities, relations, variants)
+        return list(entities), list(relations)
+
+    def process_long_text(self, text, chunk_chars=CHUNK_CHARS, batch_size=8):
+        """Обрабатывает длинный текст по частям и сшивает результаты в один.
+
+        Части разбираются пакетом через nlp.pipe, а правила всех частей пишут в общий
+        контекст, который завершается один раз в конце. Поэтому результат совпадает с
+        разбором текста одним документом везде, где парсер не связывает слова через
+        границу частей, а в памяти одновременно находятся лишь batch_size частей.
+        Разобранные части в кэш не сохраняются, только итоговый результат.
+        """
+        if self.cache is not None:
+            text = normalize_text(text)
+            _, result_key = self._cache_keys(text)
+            cached = self._cached_result(result_key)
+            if cached is not None:
+                return cached
+
+        docs = get_nlp().pipe(split_long_text(text, chunk_chars), batch_size=batch_size)
+        entities, relations, variants = self._extract(profiler.timed("parse", docs))
+
+        if self.cache is not None:
+            self.cache.put_result(result_key, entities, relations, variants)
+        return entities, relations
 
-            # Существительные как главные сущности
-                if token.pos_ in ("NOUN", "PROPN") and token.dep_ == "ROOT":
-                    main_entities.add(token.text)
+    def process_chunks(self, docs):
+        """Применяет правила к разобранным частям одного текста и возвращает сущности и связи.
 
-        # Добавляем главные сущности
-            for entity in main_entities:
-                if entity.lower() in self.general_terms:
-                    entities.add((entity.lower(), "Attribute"))
-                else:
-                    entities.add((entity.lower(), "MainEntity"))
+        Правила всех частей пишут в общий контекст, который завершается один раз в конце.
+        Модель здесь не вызывается, поэтому части можно разобрать в другом потоке.
+        """
+        entities, relations, _ = self._extract(docs)
+        return entities, relations
 
-        # Обработка обстоятельств места
-            for token in doc:
-                if token.dep_ == "obl" and any(child.dep_ == "case" for child in token.children):
-                    place = " ".join([child.text for child in token.children if child.dep_ == "case"]) + " " + token.text
-                    print(f"Обнаружено место действия: {place}")
-                    entities.add((place.lower(), "Attribute"))
-                    if token.head.pos_ == "VERB":
-                        relations.add((token.head.lemma_, place.lower(), "has_location"))
-
-        # Обработка однородных глаголов
-            for token in doc:
-                if token.dep_ == "conj" and token.head.pos_ == "VERB":
-                    print(f"Обнаружено однородное действие: {token.text} связано с {token.head.text}")
-                    entities.add((token.lemma_, "Action"))
-                    relations.add((token.head.lemma_, token.lemma_, "related_action"))
-                    for child in token.head.children:
-                        if child.dep_ == "nsubj":
-                            relations.add((child.text.lower(), token.lemma_, "performs"))
-
-        # Обработка атрибутов и связей
+    def _extract(self, docs):
+        """Применяет правила к частям документа; возвращает сущности, связи и словоформы их имён.
+
+        Словоформы собираются в Canonicalizer контекста и добавляются к словоформам редактора.
+        """
+        context = ExtractionContext()
+        for doc in docs:
+            self.apply_rules(doc, context)
+        return self.finish_extraction(context)
+
+    def finish_extraction(self, context):
+        """Завершает контекст, в который apply_rules записал все части текста.
+
+        Возвращает сущности, связи и словоформы их имён, как _extract; нужен тем, кто
+        получает части текста не сразу, например конвейеру загрузки.
+        """
+        with profiler.stage("finalize"):
+            context.finalize()
+        entities = list(context.entities)
+        relations = list(context.relations)
+        variants = context.canonicalizer.variants
+        self.canonicalizer.merge(variants)
+        logger.debug("Сущности: %s; связи: %s", entities, relations)
+        return entities, relations, variants
+
+    def _cached_result(self, result_key):
+        """Результат из кэша или None; словоформы его имён добавляются к словоформам редактора."""
+        variants = {}
+        cached = self.cache.get_result(result_key, variants)
+        if cached is not None:
+            self.canonicalizer.merge(variants)
+        return cached
+
+    def process_texts(self, texts, batch_size=64, n_process=1, as_tuples=False):
+        """Обрабатывает поток текстов пакетами через nlp.pipe и возвращает сущности и связи для каждого.
+
+        При as_tuples=True принимает пары (текст, контекст) и возвращает пары ((сущности, связи), контекст).
+        """
+        items = texts if as_tuples else ((text, None) for text in texts)
+        if self.cache is None:
+            results = self._process_stream(items, batch_size, n_process)
+        else:
+            results = self._process_cached(items, batch_size, n_process)
+
+        for result, context in results:
+            yield (result, context) if as_tuples else result
+
+    def _process_stream(self, items, batch_size, n_process):
+        """Разбирает тексты через nlp.pipe; длинные тексты разбираются по частям в исходном порядке."""
+        pending = deque()  # (контекст, длинный текст или None)
+
+        def short_texts():
+            for text, context in items:
+                is_long = len(text) > LONG_TEXT_CHARS
+                pending.append((context, text if is_long else None))
+                if not is_long:
+                    yield text, None
+
+        docs = get_nlp().pipe(short_texts(), batch_size=batch_size, n_process=n_process, as_tuples=True)
+        docs = profiler.timed("parse", docs)
+        while True:
+            parsed = next(docs, None)
+            while pending and pending[0][1] is not None:
+                context, text = pending.popleft()
+                yield self.process_long_text(text), context
+            if parsed is None:
+                break
+            context, _ = pending.popleft()
+            yield self.process_doc(parsed[0]), context
+
+    def _process_cached(self, items, batch_size, n_process):
+        """Пропускает через nlp.pipe только тексты, которых нет в кэше, сохраняя порядок входа."""
+        pending = deque()  # (ключи, контекст, результат из кэша или None, длинный текст или None)
+
+        def misses():
+            for text, context in items:
+                if len(text) > LONG_TEXT_CHARS:
+                    # Длинный текст разбирается по частям, когда до него дойдёт очередь
+                    pending.append((None, None, context, None, text))
+                    continue
+                text = normalize_text(text)
+                doc_key, result_key = self._cache_keys(text)
+                cached = self._cached_result(result_key)
+                if cached is None:
+                    doc = self.cache.get_doc(doc_key, get_nlp().vocab)
+                    if doc is not None:
+                        entities, relations, variants = self._extract((doc,))
+                        self.cache.put_result(result_key, entities, relations, variants)
+                        cached = entities, relations
+                pending.append((doc_key, result_key, context, cached, None))
+                if cached is None:
+                    yield text, None
+
+        docs = get_nlp().pipe(misses(), batch_size=batch_size, n_process=n_process, as_tuples=True)
+        docs = profiler.timed("parse", docs)
+        while True:
+            parsed = next(docs, None)
+            # Попадания в кэш и длинные тексты, стоящие перед разобранным документом, отдаются первыми
+            while pending and (pending[0][3] is not None or pending[0][4] is not None):
+                _, _, context, cached, text = pending.popleft()
+                yield (cached if text is None else self.process_long_text(text)), context
+            if parsed is None:
+                break
+            doc = parsed[0]
+            doc_key, result_key, context, _, _ = pending.popleft()
+            self.cache.put_doc(doc_key, doc)
+            entities, relations, variants = self._extract((doc,))
+            self.cache.put_result(result_key, entities, relations, variants)
+            yield (list(entities), list(relations)), context
+
+    def process_doc(self, doc):
+        """Извлекает сущности и связи из уже разобранного документа."""
+        return self.process_chunks((doc,))
+
+    def apply_rules(self, doc, context):
+        """Применяет правила к токенам документа; результаты накапливаются в context.
+
+        При включённом профилировщике каждое срабатывание правила замеряется как этап
+        «rule:семейство», так что число вызовов этапа равно числу срабатываний.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            # Структура предложения нужна только при отладке: строки токенов не собираются впустую
             for token in doc:
-            # Обработка прилагательных, связанных через "amod" с существительными
-                if token.dep_ == "amod" and token.head.text.lower() in main_entities:
-                    print(f"Прилагательное найдено: {token.text} связано с {token.head.text}")
-                    entities.add((token.text.lower(), "Attribute"))
-                    relations.add((token.head.text.lower(), token.text.lower(), "has_quality"))
-
-            # Обработка глаголов (действия) и их атрибутов
-                if token.pos_ == "VERB":
-                    entities.add((token.lemma_, "Action"))
-                    for entity in main_entities:
-                        if entity.lower() not in self.general_terms:
-                            relations.add((entity.lower(), token.lemma_, "performs"))
-
-                    for child in token.children:
-                        if child.dep_ == "nsubj" and token.morph.get("Mood") == ["Imp"]:
-                            entities.add((child.text.lower(), "Object"))
-                            relations.add((token.lemma_, child.text.lower(), "acts_on"))
-
-                        if child.dep_ in ("obj", "dobj"):
-                            entities.add((child.text.lower(), "Object"))
-                            relations.add((token.lemma_, child.text.lower(), "acts_on"))
-
-                    # Обработка наречий как атрибутов действия
-                        if child.dep_ == "advmod" and child.text.lower() not in {"кто", "что", "где", "как", "почему", "зачем"}:
-                            entities.add((child.text.lower(), "Attribute"))
-                            relations.add((token.lemma_, child.text.lower(), "has_attribute"))
-
-                    # Обработка обстоятельства места ("здесь")
-                        if child.dep_ == "advmod" and child.text.lower() == "здесь":
-                            entities.add((child.text.lower(), "Attribute"))
-                            relations.add((token.head.lemma_, child.text.lower(), "has_location"))
-
-        # Преобразуем множества в списки для удаления дубликатов
-            entities = list(entities)
-            relations = list(relations)
-
-        print("\nСущности и связи:")
-        print("Сущности:", entities)
-        print("Связи:", relations)
+                logger.debug(
+                    "Токен: %s, Лемма: %s, POS: %s, Dep: %s, Head: %s, Morph: %s",
+                    token.text, token.lemma_, token.pos_, token.dep_, token.head.text, token.morph,
+                    extra={"token": token.i},
+                )
+
+        if not self.dictionaries.compiled:
+            # Словари компилируются при первом документе, когда модель уже загружена
+            with profiler.stage("dictionaries"):
+                self.dictionaries.compile(get_nlp())
+
+        # Кандидаты для правил выбираются по массивам признаков; объектами Token становятся только они
+        with profiler.stage("features"):
+            context.features = DocFeatures(doc, self.dictionaries)
+            candidates = list(context.features.candidates())
+        timed = profiler.enabled
+        for i, rule_funcs in candidates:
+            token = doc[i]
+            for rule_func in rule_funcs:
+                if timed:
+                    with profiler.stage("rule:" + rule_func.family):
+                        rule_func(token, context)
+                else:
+                    rule_func(token, context)
 
-        return entities, relations
-    
-    def generate_json(self, entities, relations):
-        """Генерирует JSON-объект из сущностей и связей."""
-        data = {
+    def generate_data(self, entities, relations):
+        """Формирует словарь с сущностями и связями для сериализации в JSON."""
+        return {
             "entities": [{"name": entity, "type": label} for entity, label in entities],
             "relations": [{"from": head, "to": tail, "relation": relation} for head, tail, relation in relations],
         }
-        return json.dumps(data, ensure_ascii=False, indent=4)
+
+    def generate_json(self, entities, relations):
+        """Генерирует JSON-объект из сущностей и связей."""
+        with profiler.stage("json"):
+            return json.dumps(self.generate_data(entities, relations), ensure_ascii=False, indent=4)
     
 
     def save_json_to_file(self, json_data, file_name="graph_data.json"):
@@ -184,27 +653,181 @@ class SemanticObjectEditor:
         try:
             with open(file_name, "w", encoding="utf-8") as f:
                 f.write(json_data)
-            print(f"Данные сохранены в файл {file_name}")
+            logger.info("Данные сохранены в файл %s", file_name)
         except Exception as e:
-            print(f"Ошибка при сохранении файла: {e}")
-
-
-    def add_to_graph(self, entities, relations):
-        """Добавляет сущности и связи в граф."""
-        print("\nДобавление узлов и связей в граф...")
-        for entity, label in entities:
-            print(f"Добавление узла: {entity} ({label})")
-            self.graph.add_node(entity, label=label)
+            logger.error("Ошибка при сохранении файла %s: %s", file_name, e)
+
+
+    def add_to_graph(self, entities, relations, source=None):
+        """Добавляет сущности и связи в граф и, если задано, в постоянное хранилище."""
+        batch = GraphBatch()
+        batch.add(entities, relations, source=source)
+        self.merge_batch(batch)
+        if self.store is not None:
+            self.store.add_to_graph(entities, relations, source=source)
+
+    def merge_batch(self, batch):
+        """Сливает с графом и индексами накопленные в GraphBatch результаты многих документов за один шаг."""
+        self.graph_from_incremental = False
+        if self.window is not None:
+            self.slide_window(batch.documents())
+            return
+        with profiler.stage("merge"):
+            nodes, edges = batch.merge_into(self.graph, self.index)
+            self.attach_variants(nodes)
+        logger.debug("Добавлено в граф: документов %d, узлов %d, связей %d", len(batch), len(nodes), len(edges))
+
+    def slide_window(self, documents=()):
+        """Добавляет документы (источник, сущности, связи) в скользящее окно и вытесняет устаревшие.
+
+        Без документов только вытесняет те, что вышли за ограничения окна, например по
+        времени жизни, пока новых документов нет. Словоформы имён, которых больше нет в
+        графе, забываются, чтобы Canonicalizer не рос вместе с потоком документов.
+        Возвращает число вытесненных документов.
+        """
+        window = self.window
+        touched_names, touched_pairs = set(), set()
+        with profiler.stage("window"):
+            for _, entities, relations in documents:
+                window.add(entities, relations, touched_names, touched_pairs, self.index)
+            evicted = window.expire(touched_names, touched_pairs, self.index)
+            window.patch_graph(self.graph, touched_names, touched_pairs, self.index)
+            self.attach_variants(touched_names)
+            # Имена только из связей узлами не становятся, поэтому проверяются и концы пар
+            variants = self.canonicalizer.variants
+            for pair in touched_pairs:
+                touched_names.update(pair)
+            for name in touched_names:
+                if name in variants and not self.graph.has_node(name):
+                    del variants[name]
+        if evicted:
+            logger.debug("Вытеснено из окна документов: %d; в окне %d", evicted, len(window))
+        return evicted
+
+    def window_stats(self):
+        """Размер скользящего окна и графа и приблизительная память окна; None без окна."""
+        if self.window is None:
+            return None
+        return self.window.stats(self.graph, self.canonicalizer.variants)
+
+    def attach_variants(self, names):
+        """Записывает в атрибут variants узлов встреченные словоформы (для графов nx).
+
+        Узел делит множество с Canonicalizer; если имя было вытеснено из него и встретилось
+        снова, прежние словоформы узла переносятся в новое множество.
+        """
+        if not isinstance(self.graph, nx.Graph):
+            return
+        for name in names:
+            variants = self.canonicalizer.variants.get(name)
+            if variants and self.graph.has_node(name):
+                data = self.graph.nodes[name]
+                previous = data.get("variants")
+                if previous is not None and previous is not variants:
+                    variants.update(previous)
+                data["variants"] = variants
+
+    def require_removable_graph(self, mode):
+        """Проверяет, что граф умеет удалять узлы и рёбра; CompactGraph только добавляет."""
+        if not isinstance(self.graph, nx.Graph):
+            raise ValueError(f"Для {mode} нужен граф nx, а не {type(self.graph).__name__}")
+
+    def process_text_incremental(self, text):
+        """Обновляет граф по изменённым предложениям и возвращает все сущности и связи текста.
+
+        Заново разбираются только новые или изменённые предложения, а граф правится
+        удалением и добавлением затронутых узлов и рёбер. Правила применяются к каждому
+        предложению отдельно, поэтому связи через границу предложения не строятся.
+
+        Если граф заполнен не инкрементальным режимом (например, полным разбором),
+        его узлы не учтены в состоянии и не были бы удалены, поэтому граф сначала очищается.
+        """
+        self.require_removable_graph("инкрементального режима")
+        if not self.graph_from_incremental:
+            self.clear_graph()
+        state = self.incremental
+        sentences = split_sentences(normalize_text(text))
+        fingerprints = [make_key(sentence) for sentence in sentences]
+
+        # Разбираем только предложения, которых ещё нет в состоянии
+        changed = {}
+        for fingerprint, sentence in zip(fingerprints, sentences):
+            if fingerprint not in state.sentence_results:
+                changed[fingerprint] = sentence
+        if changed:
+            logger.info("Повторный разбор предложений: %d из %d", len(changed), len(sentences))
+            for fingerprint, (entities, relations) in zip(changed, self.process_texts(changed.values())):
+                state.sentence_results[fingerprint] = (list(entities), list(relations))
+
+        touched_names, touched_pairs = set(), set()
+        state.update(fingerprints, touched_names, touched_pairs, self.index)
+        state.patch_graph(self.graph, touched_names, touched_pairs, self.index)
+        self.attach_variants(touched_names)
+        self.graph_from_incremental = True
+
+        return list(state.entity_counts), list(state.relation_counts)
+
+    def create_model_from_text(self, text, source=None):
+        """Создает модель графа на основе текста; source - идентификатор документа для хранилища."""
+        entities, relations = self.process_text(text)
+        if source is None and self.store is not None:
+            source = make_key(normalize_text(text))
+        self.add_to_graph(entities, relations, source=source)
+        return entities, relations
 
-        for head, tail, relation in relations:
-            print(f"Добавление связи: {head} -[{relation}]-> {tail}")
-            if self.graph.has_node(head) and self.graph.has_node(tail):
-                self.graph.add_edge(head, tail, relation=relation)
+    def create_model_from_file(self, path, unit="paragraph", batch_size=64, progress=None):
+        """Строит граф по большому файлу, читая его фрагментами через mmap; возвращает число фрагментов.
+
+        progress - необязательная функция, которой каждые 1000 фрагментов передаётся их число.
+        """
+        chunks = ((text, doc_id) for doc_id, text in read_chunks(path, unit=unit))
+        count = 0
+        batch = GraphBatch()
+        for (entities, relations), doc_id in self.process_texts(chunks, batch_size=batch_size, as_tuples=True):
+            batch.add(entities, relations, source=doc_id)
+            if self.store is not None:
+                self.store.add_to_graph(entities, relations, source=doc_id)
+            if len(batch) >= MERGE_BATCH_DOCS:
+                self.merge_batch(batch)
+                batch = GraphBatch()
+            count += 1
+            if progress is not None and count % 1000 == 0:
+                progress(count)
+        self.merge_batch(batch)
+        return count
+
+    def find_nodes(self, label):
+        """Возвращает узлы с заданной меткой (MainEntity, Action, Object, Attribute, Question)."""
+        return self.index.nodes(label)
+
+    def find_edges(self, relation=None, head=None, tail=None):
+        """Возвращает связи (голова, хвост, тип) по типу связи и/или концам.
+
+        Например, find_edges("performs", tail="читать") - кто выполняет действие «читать».
+        """
+        if not self.index.indexes_edges:
+            return self.graph.find_edges(relation=relation, head=head, tail=tail)
+        return self.index.edges(relation=relation, head=head, tail=tail)
+
+    def ego_view(self, entity, radius=1, limit=200):
+        """Подграф для отрисовки: сущность и её соседи не дальше radius шагов."""
+        return ego_view(self.graph, entity, radius=radius, limit=limit)
+
+    def top_view(self, n=50, by="degree"):
+        """Подграф из n узлов с наибольшей степенью (by="degree") или числом упоминаний (by="frequency")."""
+        if by == "degree" and not self.index.indexes_edges:
+            nodes = self.graph.top_nodes(n)
+        else:
+            nodes = self.index.top_nodes(n, by=by)
+        return top_view(self.graph, nodes)
 
-    def create_model_from_text(self, text):
-        """Создает модель графа на основе текста."""
-        entities, relations = self.process_text(text)
-        self.add_to_graph(entities, relations)
+    def relation_view(self, relation, limit=500):
+        """Подграф из связей одного типа, например relation_view("performs")."""
+        if self.index.indexes_edges:
+            edges = ((head, tail, relation) for head, tail in self.index.by_relation.get(relation, ()))
+        else:
+            edges = self.graph.find_edges(relation)
+        return relation_view(self.graph, edges, limit=limit)
 
     def display_graph(self):
         """Выводит узлы и связи графа в консоль."""
@@ -216,32 +839,85 @@ class SemanticObjectEditor:
         for edge in self.graph.edges(data=True):
             print(f"Edge: {edge}")
 
-    def visualize_graph(self):
-        """Визуализирует граф с помощью matplotlib."""
-        pos = nx.spring_layout(self.graph, k=2.0, iterations=100)
-        labels = nx.get_edge_attributes(self.graph, "relation")
+    def layout_graph(self, graph=None):
+        """Вычисляет координаты узлов графа; уже размещённые узлы сохраняют свои координаты."""
+        graph = self._as_networkx(self.graph if graph is None else graph)
+        # Представления раскладываются отдельно, чтобы не сбрасывать координаты полного графа
+        engine = self.view_layout_engine if "view" in graph.graph else self.layout_engine
+        with profiler.stage("layout"):
+            return engine.layout(graph)
+
+    @staticmethod
+    def _as_networkx(graph):
+        """Преобразует компактное хранилище в nx.DiGraph для раскладки и отрисовки."""
+        return graph.to_networkx() if hasattr(graph, "to_networkx") else graph
+
+    def draw_graph(self, graph, pos, ax=None):
+        """Рисует граф с подписями на заданных осях matplotlib.
+
+        Узлы и шрифт уменьшаются с ростом числа узлов, чтобы крупные представления оставались читаемыми.
+        """
+        labels = nx.get_edge_attributes(graph, "relation")
+        crowded = graph.number_of_nodes() > 30
         node_colors = [
-            "orange" if "Question" in self.graph.nodes[node]["label"] else
-            "skyblue" if "MainEntity" in self.graph.nodes[node]["label"] else
-            "lightgreen" if "Action" in self.graph.nodes[node]["label"] else
+            "orange" if "Question" in graph.nodes[node]["label"] else
+            "skyblue" if "MainEntity" in graph.nodes[node]["label"] else
+            "lightgreen" if "Action" in graph.nodes[node]["label"] else
             "yellow"
-            for node in self.graph.nodes
+            for node in graph.nodes
         ]
-        plt.figure(figsize=(20, 20))
         nx.draw(
-            self.graph,
+            graph,
             pos,
+            ax=ax,
             with_labels=True,
-            node_size=3000,
+            node_size=max(300, 90000 // graph.number_of_nodes()) if crowded else 3000,
             node_color=node_colors,
-            font_size=12,
+            font_size=8 if crowded else 12,
             edgecolors="black",
-            width=2,
+            width=1 if crowded else 2,
         )
-        nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=labels, font_size=10,label_pos=0.5)
+        nx.draw_networkx_edge_labels(graph, pos, edge_labels=labels, font_size=7 if crowded else 10,label_pos=0.5, ax=ax)
+
+    def visualize_graph(self, graph=None, pos=None, block=True):
+        """Визуализирует граф с помощью matplotlib.
+
+        Можно передать копию графа и заранее вычисленные координаты, например из фонового потока.
+        """
+        import matplotlib.pyplot as plt  # Импортируем только при визуализации
+
+        graph = self._as_networkx(self.graph if graph is None else graph)
+        if pos is None:
+            pos = self.layout_graph(graph)
+        plt.figure(figsize=(20, 20))
+        self.draw_graph(graph, pos)
         plt.title("Семантический граф", fontsize=16)
-        plt.show()
+        plt.show(block=block)
+
+    def render_graph(self, file_name, graph=None, pos=None, figsize=(20, 20)):
+        """Сохраняет изображение графа в файл (PNG, SVG и др. по расширению) без открытия окна."""
+        # Используем Figure напрямую: pyplot и оконный backend не нужны
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        graph = self._as_networkx(self.graph if graph is None else graph)
+        if pos is None:
+            pos = self.layout_graph(graph)
+        with profiler.stage("render"):
+            figure = Figure(figsize=figsize)
+            FigureCanvasAgg(figure)
+            ax = figure.add_subplot()
+            self.draw_graph(graph, pos, ax=ax)
+            ax.set_title("Семантический граф", fontsize=16)
+            figure.savefig(file_name)
+        logger.info("Граф сохранён в файл %s", file_name)
 
     def clear_graph(self):
-        """Очищает граф."""
+        """Очищает граф, его индексы, состояние режимов и собранные словоформы."""
         self.graph.clear()
+        self.incremental = IncrementalState()
+        self.graph_from_incremental = True
+        self.index.clear()
+        self.canonicalizer.clear()
+        if self.window is not None:
+            self.window.clear()